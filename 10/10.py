@@ -1,282 +1,176 @@
 import typer
+from collections import deque
 from enum import Enum
 
+import numpy as np
+
 
 class Direction(Enum):
-    NORTH = 1
+    NORTH = 0
+    EAST = 1
     SOUTH = 2
     WEST = 3
-    EAST = 4
-
-
-def get_opposite_direction(direction: Direction):
-    if direction == Direction.NORTH:
-        return Direction.SOUTH
-    elif direction == Direction.SOUTH:
-        return Direction.NORTH
-    elif direction == Direction.WEST:
-        return Direction.EAST
-    elif direction == Direction.EAST:
-        return Direction.WEST
-    else:
-        raise Exception(f"Unknown direction: {direction}")
-
-
-def get_coordinates_in_direction(x: int, y: int, direction: Direction):
-    if direction == Direction.NORTH:
-        return x, y - 1
-    elif direction == Direction.SOUTH:
-        return x, y + 1
-    elif direction == Direction.WEST:
-        return x - 1, y
-    elif direction == Direction.EAST:
-        return x + 1, y
-    else:
-        raise Exception(f"Unknown direction: {direction}")
-
-
-class Node:
-    pass
-
-
-class Node:
-    def NodeType(enum):
-        LOOP: 1
-        LEFT: 2
-        RIGHT: 3
-
-    def connect(self, other: Node, direction: Direction) -> bool:
-        direction_reverse = get_opposite_direction(direction)
-        if (
-            direction in self.can_connect
-            and direction_reverse in other.can_connect
-        ):
-            if other not in self.connected:
-                self.connected.append(other)
-            if other not in self.connected:
-                other.connected.append(self)
-            return True
-        return False
-
-    def connect_in_matrix(
-        self,
-        matrix: list[list[Node]],
-        tgt_x: int,
-        tgt_y: int,
-        direction: Direction,
-    ):
-        try:
-            self.connect(matrix[tgt_y][tgt_x], direction)
-        except IndexError:
-            pass
-
-    def connect_direction(self, matrix: list[list[Node]]):
-        for direction in self.can_connect:
-            self.connect_in_matrix(
-                matrix,
-                *get_coordinates_in_direction(self.x, self.y, direction),
-                direction,
-            )
 
-    def __init__(self, value: str, x: int, y: int):
-        self.value = value
-        if value == ".":
-            self.can_connect = []
-        elif value == "|":
-            self.can_connect = [Direction.SOUTH, Direction.NORTH]
-        elif value == "-":
-            self.can_connect = [Direction.WEST, Direction.EAST]
-        elif value == "F":
-            self.can_connect = [Direction.SOUTH, Direction.EAST]
-        elif value == "J":
-            self.can_connect = [Direction.NORTH, Direction.WEST]
-        elif value == "7":
-            self.can_connect = [Direction.SOUTH, Direction.WEST]
-        elif value == "S":
-            self.can_connect = [
-                Direction.NORTH,
-                Direction.EAST,
-                Direction.SOUTH,
-                Direction.WEST,
-            ]
-        elif value == "L":
-            self.can_connect = [Direction.NORTH, Direction.EAST]
-        else:
-            raise Exception(f"Unknown node value: {value}")
-        self.x = x
-        self.y = y
-        self.connected = []
-        self.type = None
-        self.side = None
-
-
-def find_connected_nodes(start: Node, matrix: list[list[Node]]):
-    connected = []
-    queue = start.connected.copy()
-    while len(queue) > 0:
-        n = queue.pop(0)
-        if n not in connected:
-            connected.append(n)
-            queue.extend(n.connected)
-    return connected
-
-
-def get_adjacent_nodes(node: Node, matrix: list[list[Node]]):
-    adjacent = []
+
+# indexed by Direction.value
+DX = (0, 1, 0, -1)
+DY = (-1, 0, 1, 0)
+
+PIPE_CONNECTIONS = {
+    "|": (Direction.NORTH, Direction.SOUTH),
+    "-": (Direction.EAST, Direction.WEST),
+    "L": (Direction.NORTH, Direction.EAST),
+    "J": (Direction.NORTH, Direction.WEST),
+    "7": (Direction.SOUTH, Direction.WEST),
+    "F": (Direction.EAST, Direction.SOUTH),
+}
+
+
+def get_opposite_direction(direction: int) -> int:
+    return (direction + 2) % 4
+
+
+def build_turn_table() -> dict[str, dict[int, int]]:
+    # for every pipe: heading when entering the tile -> heading when leaving
+    turns = {}
+    for pipe, (a, b) in PIPE_CONNECTIONS.items():
+        turns[pipe] = {
+            get_opposite_direction(a.value): b.value,
+            get_opposite_direction(b.value): a.value,
+        }
+    return turns
+
+
+TURNS = build_turn_table()
+
+
+def find_start(rows: list[str]) -> tuple[int, int]:
+    for y, row in enumerate(rows):
+        x = row.find("S")
+        if x >= 0:
+            return x, y
+    raise Exception("No start node found")
+
+
+def walk_loop(rows: list[str], start: tuple[int, int], heading: int):
+    width = len(rows[0])
+    height = len(rows)
+    x, y = start
+    path = [start]
+    while True:
+        x += DX[heading]
+        y += DY[heading]
+        if not (0 <= x < width and 0 <= y < height):
+            return None
+        if (x, y) == start:
+            return path
+        turn = TURNS.get(rows[y][x])
+        if turn is None or heading not in turn:
+            return None
+        path.append((x, y))
+        heading = turn[heading]
+
+
+def find_loop(rows: list[str]) -> np.ndarray:
+    """
+    Return the pipe loop through S as an ordered (n, 2) array of (x, y).
+
+    """
+    start = find_start(rows)
     for direction in Direction:
-        x, y = get_coordinates_in_direction(node.x, node.y, direction)
-        try:
-            adjacent.append(matrix[y][x])
-        except IndexError:
-            pass
-    return adjacent
-
-
-def node_in_list(node: Node, l: list[Node]):
-    for n in l:
-        if n.x == node.x and n.y == node.y:
-            return True
-    return False
-
-
-def print_matrix_sides(
-    matrix: list[list[Node]],
-    left: list[Node],
-    right: list[Node],
-    loop: list[Node],
-):
-    i = 0
-    o = 0
-    for row in matrix:
-        for node in row:
-            if node_in_list(node, loop):
-                if node.value == "7":
-                    print("┐", end="")
-                elif node.value == "J":
-                    print("┘", end="")
-                elif node.value == "F":
-                    print("┌", end="")
-                elif node.value == "L":
-                    print("└", end="")
-                elif node.value == "|":
-                    print("│", end="")
-                elif node.value == "-":
-                    print("─", end="")
-                else:
-                    print(node.value, end="")
-            elif node_in_list(node, left):
-                print("O", end="")
-                o += 1
-            elif node_in_list(node, right):
-                print("I", end="")
-                i += 1
-            else:
-                print(".", end="")
-        print()
-
-    print(f"Num I: {i}, Num O: {o}")
-
-
-def get_node_in_matrix(x: int, y: int, matrix: list[list[Node]]):
-    try:
-        return matrix[y][x]
-    except IndexError:
-        return None
-
-
-def get_right_nodes(node: Node, prev_node: Node, matrix: list[list[Node]]):
-    right = []
-    if node.x < prev_node.x and node.y == prev_node.y:
-        right.append(get_node_in_matrix(node.x, node.y - 1, matrix))
-        right.append(get_node_in_matrix(prev_node.x, node.y - 1, matrix))
-    elif node.x > prev_node.x and node.y == prev_node.y:
-        right.append(get_node_in_matrix(node.x, node.y + 1, matrix))
-        right.append(get_node_in_matrix(prev_node.x, node.y + 1, matrix))
-    elif node.y < prev_node.y and node.x == prev_node.x:
-        right.append(get_node_in_matrix(node.x + 1, node.y, matrix))
-        right.append(get_node_in_matrix(node.x + 1, prev_node.y, matrix))
-    elif node.y > prev_node.y and node.x == prev_node.x:
-        right.append(get_node_in_matrix(node.x - 1, node.y, matrix))
-        right.append(get_node_in_matrix(node.x - 1, prev_node.y, matrix))
-    else:
-        raise Exception(
-            f"Unknown direction, from x: {prev_node.x}, y: {prev_node.y} to x: {node.x}, y: {node.y}"
-        )
-    return right
-
-
-def find_sides(loop: list[Node], matrix: list[list[Node]]):
-    side_left = []
-    side_right = []
-    start_node = loop[0]
-
-    prev_node = start_node
-    current_node = start_node.connected[1]
-
-    while current_node != start_node:
-        r = get_right_nodes(current_node, prev_node, matrix)
-        for n in r:
-            if n not in loop and n not in side_right:
-                side_right.append(n)
-
-        next_node = (
-            current_node.connected[0]
-            if current_node.connected[0] != prev_node
-            else current_node.connected[1]
-        )
-        prev_node = current_node
-        current_node = next_node
-
-    print_matrix_sides(matrix, side_left, side_right, loop)
-
-    queue = side_right.copy()
-    processed = []
-    while len(queue) > 0:
-        node = queue.pop(0)
-        adjacent = get_adjacent_nodes(node, matrix)
-        for a in adjacent:
-            if a in loop or a in processed:
-                continue
-            elif a in side_left:
-                raise Exception("Node in both sides")
-            side_right.append(a)
-            queue.append(a)
-            processed.append(node)
-
-    print_matrix_sides(matrix, side_left, side_right, loop)
-
-
-def main(input_file: typer.FileText):
-    input = input_file.read().split("\n")
-
-    nodes = []
-    node_matrix = []
-
-    print("Reading input...")
-    for y, row in enumerate(input):
-        node_row = []
-        for x, value in enumerate(row):
-            node = Node(value, x, y)
-            if value != ".":
-                nodes.append(node)
-            node_row.append(node)
-        node_matrix.append(node_row)
-
-    print("Connecting nodes...")
-    start_node = None
-    for row in node_matrix:
-        for node in row:
-            if node.value == "S":
-                start_node = node
-            node.connect_direction(node_matrix)
-
-    print("Finding connected nodes in loop...")
-    loop = find_connected_nodes(start_node, node_matrix)
-    print(f"Part 1: Farthest node distance: {len(loop) //2}")
-
-
-    print("Finding sides...")
-    find_sides(loop, node_matrix)
+        path = walk_loop(rows, start, direction.value)
+        if path is not None:
+            return np.array(path, dtype=np.int64)
+    raise Exception(f"No loop found through start node {start}")
+
+
+def loop_bitmap(loop: np.ndarray, width: int, height: int) -> np.ndarray:
+    on_loop = np.zeros((height, width), dtype=bool)
+    on_loop[loop[:, 1], loop[:, 0]] = True
+    return on_loop
+
+
+def enclosed_tiles(loop: np.ndarray) -> int:
+    xs = loop[:, 0]
+    ys = loop[:, 1]
+    xn = np.roll(xs, -1)
+    yn = np.roll(ys, -1)
+    # trapezoid form of the shoelace formula: with unit steps every term is
+    # bounded by twice the grid height, so the int64 sum cannot overflow
+    double_area = abs(int(((xs - xn) * (ys + yn)).sum()))
+    # Pick's theorem: A = i + b / 2 - 1
+    return (double_area - len(loop) + 2) // 2
+
+
+def flood_fill_enclosed(
+    loop: np.ndarray, on_loop: np.ndarray
+) -> int:
+    """
+    Count the enclosed tiles by flood filling the inside of the loop, as a
+    cross-check on enclosed_tiles.
+
+    """
+    height, width = on_loop.shape
+    path = loop.tolist()
+    # headings[i] is the step from path[i] to path[i + 1]
+    headings = []
+    for (x, y), (nx, ny) in zip(path, path[1:] + path[:1]):
+        if nx == x:
+            headings.append(Direction.NORTH.value if ny < y else Direction.SOUTH.value)
+        else:
+            headings.append(Direction.EAST.value if nx > x else Direction.WEST.value)
+
+    # with y pointing down a positive shoelace sum means the walk is
+    # clockwise on screen, and then the inside is on its right hand side
+    xs = loop[:, 0]
+    ys = loop[:, 1]
+    double_area = int((xs * np.roll(ys, -1) - np.roll(xs, -1) * ys).sum())
+    # side 1 is the right hand side of the walk, side 3 the left hand side
+    side = 1 if double_area > 0 else 3
+
+    seen = bytearray(on_loop.tobytes())
+    queue = deque()
+    for i, (x, y) in enumerate(path):
+        for heading in (headings[i - 1], headings[i]):
+            sx = x + DX[(heading + side) % 4]
+            sy = y + DY[(heading + side) % 4]
+            if 0 <= sx < width and 0 <= sy < height:
+                if not seen[sy * width + sx]:
+                    seen[sy * width + sx] = 1
+                    queue.append((sx, sy))
+
+    count = 0
+    while queue:
+        x, y = queue.popleft()
+        count += 1
+        for d in range(4):
+            nx = x + DX[d]
+            ny = y + DY[d]
+            if 0 <= nx < width and 0 <= ny < height and not seen[ny * width + nx]:
+                seen[ny * width + nx] = 1
+                queue.append((nx, ny))
+    return count
+
+
+def main(input_file: typer.FileText, cross_check: bool = False):
+    input = [row for row in input_file.read().split("\n") if row]
+
+    print("Finding loop...")
+    loop = find_loop(input)
+    print(f"Part 1: Farthest node distance: {len(loop) // 2}")
+
+    print("Counting enclosed tiles...")
+    enclosed = enclosed_tiles(loop)
+    print(f"Part 2: Enclosed tiles: {enclosed}")
+
+    if cross_check:
+        on_loop = loop_bitmap(loop, len(input[0]), len(input))
+        flooded = flood_fill_enclosed(loop, on_loop)
+        print(f"Flood fill enclosed tiles: {flooded}")
+        if flooded != enclosed:
+            raise Exception(
+                f"Flood fill found {flooded} enclosed tiles, expected {enclosed}"
+            )
 
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@ import functools
 from rich.logging import RichHandler
 import logging
 from rich.progress import track, Progress
+import os
+import time
 
 from multiprocessing import Pool, freeze_support
 
@@ -13,39 +15,37 @@ logging.basicConfig(
 )
 log = logging.getLogger("rich")
 
-memo = {}
 
-
-def get_spaces(
-    input_string: str,
-    groups: tuple[int],
-) -> int:
-    global memo
-    if (input_string, groups) in memo:
-        return memo[(input_string, groups)]
-
-    num_solutions = 0
-
-    if not groups:
-        if "#" in input_string:
-            return 0
-        else:
-            return 1
-
-    for space in range(0, len(input_string) - sum(groups) - len(groups) + 2):
-        if "#" in input_string[:space]:
-            break
-        if "." in input_string[space : space + groups[0]]:
-            continue
-        if "#" == input_string[space + groups[0] : space + groups[0] + 1]:
-            continue
-
-        num_solutions += get_spaces(
-            input_string[space + groups[0] + 1 :],
-            groups[1:],
-        )
-    memo[(input_string, groups)] = num_solutions
-    return num_solutions
+def count_arrangements(springs: str, groups: tuple[int]) -> int:
+    """
+    Count the ways to place `groups` in `springs`, as a DP over (position,
+    group index) that keeps one row of the table per group.
+
+    """
+    n = len(springs)
+    # dots_before[i]: number of '.' in springs[:i]
+    dots_before = [0] * (n + 1)
+    for i, c in enumerate(springs):
+        dots_before[i + 1] = dots_before[i] + (c == ".")
+    # next_hash[i]: index of the first '#' at or after i
+    next_hash = [n] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        next_hash[i] = i if springs[i] == "#" else next_hash[i + 1]
+
+    # ways[i]: arrangements of the remaining groups in springs[i:]
+    ways = [1 if next_hash[i] == n else 0 for i in range(n + 1)]
+    for group in reversed(groups):
+        next_ways = [0] * (n + 1)
+        for i in range(n - group, -1, -1):
+            count = 0 if springs[i] == "#" else next_ways[i + 1]
+            end = i + group
+            if dots_before[end] == dots_before[i] and (
+                end == n or springs[end] != "#"
+            ):
+                count += ways[min(end + 1, n)]
+            next_ways[i] = count
+        ways = next_ways
+    return ways[0]
 
 
 def lmao(args) -> list[str]:
@@ -53,23 +53,78 @@ def lmao(args) -> list[str]:
     groups = args[1]
 
     log.debug(f"Processing {spring_conditions} {groups}")
-    num_solutions = get_spaces(spring_conditions, groups)
+    num_solutions = count_arrangements(spring_conditions, groups)
 
     return num_solutions
 
 
-def multi_lmao(lmao_args: list[tuple], nproc: int = 1) -> int:
+def lmao_chunk(chunk: list[tuple]) -> tuple[int, int, int, float]:
+    t_start = time.time()
+    ans = sum(lmao(args) for args in chunk)
+    t_end = time.time()
+    return ans, len(chunk), os.getpid(), t_end - t_start
+
+
+def estimate_cost(args) -> int:
+    # the DP visits every position once per group, and only the '?' make
+    # a position branch
+    spring_conditions = args[0]
+    groups = args[1]
+    return (spring_conditions.count("?") + 1) * (len(groups) + 1)
+
+
+def schedule(lmao_args: list[tuple], nproc: int) -> list[list[tuple]]:
+    """
+    Split rows into chunks, most expensive first: expensive rows get a
+    chunk of their own, cheap rows are batched up to a similar cost.
+
+    """
+    costs = sorted(
+        ((estimate_cost(args), args) for args in lmao_args),
+        key=lambda c: c[0],
+        reverse=True,
+    )
+    total = sum(cost for cost, _ in costs)
+    target = max(1, total // (nproc * 8))
+
+    chunks = []
+    chunk = []
+    chunk_cost = 0
+    for cost, args in costs:
+        chunk.append(args)
+        chunk_cost += cost
+        if chunk_cost >= target:
+            chunks.append(chunk)
+            chunk = []
+            chunk_cost = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def multi_lmao(
+    lmao_args: list[tuple], p: Pool, nproc: int, stats: dict[int, list]
+) -> int:
     ans = 0
     with Progress() as progress:
         task_id = progress.add_task("Working...", total=len(lmao_args))
-        with Pool(processes=nproc) as p:
-            for result in p.imap(lmao, lmao_args):
-                ans += result
-                progress.advance(task_id)
+        for result, rows, pid, seconds in p.imap_unordered(
+            lmao_chunk, schedule(lmao_args, nproc)
+        ):
+            ans += result
+            worker_stats = stats.setdefault(pid, [0, 0.0])
+            worker_stats[0] += rows
+            worker_stats[1] += seconds
+            progress.advance(task_id, rows)
 
     return ans
 
 
+def log_worker_stats(stats: dict[int, list]):
+    for pid, (rows, seconds) in sorted(stats.items()):
+        log.info(f"Worker {pid}: {rows} rows, {seconds:.2f} seconds")
+
+
 def main(
     input_file: typer.FileText,
     log_level: str = "INFO",
@@ -85,27 +140,31 @@ def main(
     if n >= 0:
         input = [input[n]]
 
-    if part1:
-        part1_input = []
-        for line in input:
-            i = line.split(" ")
-            spring_conditions = i[0]
-            groups = tuple([int(g) for g in i[1].split(",")])
-            part1_input.append((spring_conditions, groups))
-
-        ans = multi_lmao(part1_input, nproc)
-        log.info(f"Part 1: Answer: {ans}")
-
-    if part2:
-        part2_input = []
-        for line in input:
-            i = line.split(" ")
-            spring_conditions = (i[0] + "?") * 4 + i[0]
-            groups = tuple([int(g) for g in i[1].split(",")] * 5)
-            part2_input.append((spring_conditions, groups))
-
-        ans = multi_lmao(part2_input, nproc)
-        log.info(f"Part 2: Answer: {ans}")
+    stats = {}
+    with Pool(processes=nproc) as p:
+        if part1:
+            part1_input = []
+            for line in input:
+                i = line.split(" ")
+                spring_conditions = i[0]
+                groups = tuple([int(g) for g in i[1].split(",")])
+                part1_input.append((spring_conditions, groups))
+
+            ans = multi_lmao(part1_input, p, nproc, stats)
+            log.info(f"Part 1: Answer: {ans}")
+
+        if part2:
+            part2_input = []
+            for line in input:
+                i = line.split(" ")
+                spring_conditions = (i[0] + "?") * 4 + i[0]
+                groups = tuple([int(g) for g in i[1].split(",")] * 5)
+                part2_input.append((spring_conditions, groups))
+
+            ans = multi_lmao(part2_input, p, nproc, stats)
+            log.info(f"Part 2: Answer: {ans}")
+
+    log_worker_stats(stats)
 
 
 if __name__ == "__main__":
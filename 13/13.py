@@ -1,6 +1,8 @@
 import typer
 from itertools import combinations, groupby
 
+from multiprocessing import Pool, freeze_support
+
 
 def print_matrix(matrix: list[str], title: str | None = None, details: bool =
                  False) -> None:
@@ -18,71 +20,69 @@ def print_matrix(matrix: list[str], title: str | None = None, details: bool =
     print()
 
 
-def transpose(matrix: list[str]) -> list[str]:
-    t = list(zip(*matrix))
-    return ["".join(row) for row in t]
-
-
-def find_reflection(pattern: list[str]) -> int | None:
-    for r in range(1, len(pattern)):
-        side_a = pattern[:r]
-        side_b = pattern[r:]
-        side_a = side_a[-len(side_b) :]
-        side_b = side_b[: len(side_a)]
-        side_b.reverse()
-        # print_matrix(side_a, "Side A:", True)
-        # print_matrix(side_b, "Side B:", True)
-        if side_a == side_b:
-            return r
-    return None
-
-
-def find_reflection_with_smudge(pattern: list[str]) -> int | None:
-    for r in range(1, len(pattern)):
-        side_a = pattern[:r]
-        side_b = pattern[r:]
-        side_a = side_a[-len(side_b) :]
-        side_b = side_b[: len(side_a)]
-        side_b.reverse()
-        inequalities = 0
-        for row_a, row_b in zip(side_a, side_b):
-            inequalities += sum(a != b for a, b in zip(row_a, row_b))
-            if inequalities > 1:
+def encode_pattern(pattern: list[str]) -> tuple[list[int], list[int]]:
+    rows = [int(row.replace("#", "1").replace(".", "0"), 2) for row in pattern]
+    width = len(pattern[0])
+    columns = [0] * width
+    for row in rows:
+        for c in range(width):
+            columns[c] = (columns[c] << 1) | ((row >> (width - 1 - c)) & 1)
+    return rows, columns
+
+
+def find_reflections(masks: list[int]) -> tuple[int | None, int | None]:
+    """
+    Return the first axis that mirrors exactly and the first axis that
+    mirrors with exactly one smudge.
+
+    """
+    reflection = None
+    reflection_with_smudge = None
+    for r in range(1, len(masks)):
+        differences = 0
+        for a, b in zip(reversed(masks[:r]), masks[r:]):
+            differences += (a ^ b).bit_count()
+            if differences > 1:
                 break
-        if inequalities == 1:
-            #print_matrix(side_a, "Side A:", True)
-            #print_matrix(side_a, "Side B:", True)
-            return r
-    return None
-
-def calc_magic_sum_for_patterns(patterns: list[list[str]], fn) -> int:
-    sum = 0
-    for pattern in patterns:
-        # print_matrix(pattern, "Finding reflection for pattern:")
-        reflection = fn(pattern)
-        if reflection:
-            print(f"Reflection found on row {reflection}")
-            sum += reflection * 100
-            continue
-        reflection = fn(transpose(pattern))
-        if reflection:
-            print(f"Reflection found on column {reflection}")
-            sum += reflection
-            continue
-        raise "Reflection not found"
-    return sum
-
-
-def main(input_file: typer.FileText):
+        if differences == 0 and reflection is None:
+            reflection = r
+        elif differences == 1 and reflection_with_smudge is None:
+            reflection_with_smudge = r
+        if reflection is not None and reflection_with_smudge is not None:
+            break
+    return reflection, reflection_with_smudge
+
+
+def summarize_pattern(pattern: list[str]) -> tuple[int, int]:
+    rows, columns = encode_pattern(pattern)
+    row_reflections = find_reflections(rows)
+    column_reflections = find_reflections(columns)
+    summary = []
+    for row, column in zip(row_reflections, column_reflections):
+        if row:
+            summary.append(row * 100)
+        elif column:
+            summary.append(column)
+        else:
+            raise Exception(f"Reflection not found in pattern: {pattern}")
+    return summary[0], summary[1]
+
+
+def main(input_file: typer.FileText, nproc: int = 1):
     input = input_file.read().strip().split("\n")
     patterns = [list(g) for k, g in groupby(input, key=bool) if k]
-    
-    sum = calc_magic_sum_for_patterns(patterns, find_reflection)
-    print(f"Part 1: Sum: {sum}")
-    
-    sum = calc_magic_sum_for_patterns(patterns, find_reflection_with_smudge)
-    print(f"Part 2: Sum: {sum}")
+
+    if nproc > 1:
+        with Pool(processes=nproc) as p:
+            chunksize = max(1, len(patterns) // (nproc * 4))
+            summaries = p.map(summarize_pattern, patterns, chunksize)
+    else:
+        summaries = [summarize_pattern(pattern) for pattern in patterns]
+
+    print(f"Part 1: Sum: {sum(s[0] for s in summaries)}")
+    print(f"Part 2: Sum: {sum(s[1] for s in summaries)}")
 
 
 if __name__ == "__main__":
+    freeze_support()
     typer.run(main)
@@ -1,62 +1,82 @@
 import typer
 from itertools import combinations, groupby
 
-
-def transpose(matrix: list[str]) -> list[str]:
-    t = list(zip(*matrix))
-    return ["".join(row) for row in t]
-
-
-def rotate_right(matrix: list[str]) -> list[str]:
-    return transpose(matrix[::-1])
-
-
-def rotate_left(matrix: list[str]) -> list[str]:
-    return transpose(matrix)[::-1]
-
-
-def tilt_west(matrix: list[str]) -> list[str]:
-    new_matrix = []
-    for row in matrix:
-        rock = 0
-        new_row = ""
-
-        row_rocks = row.split("#")
-        for i, part in enumerate(row.split("#")):
-            if i > 0:
-                new_row += "#"
-            new_row += "".join([c for c in part if c == "O"])
-            new_row += "".join([c for c in part if c == "."])
-
-        new_matrix.append(new_row)
-    return new_matrix
-
-
-def tilt_north(matrix: list[str]) -> list[str]:
-    matrix = rotate_left(matrix)
-    matrix = tilt_west(matrix)
-    matrix = rotate_right(matrix)
-    return matrix
-
-
-def tilt_east(matrix: list[str]) -> list[str]:
-    matrix = rotate_left(rotate_left(matrix))
-    matrix = tilt_west(matrix)
-    matrix = rotate_right(rotate_right(matrix))
-    return matrix
-
-
-def tilt_south(matrix: list[str]) -> list[str]:
-    matrix = rotate_right(matrix)
-    matrix = tilt_west(matrix)
-    matrix = rotate_left(matrix)
-    return matrix
-
-
-def get_load(matrix: list[str]) -> int:
-    return sum(
-        [row.count("O") * (i + 1) for i, row in enumerate(reversed(matrix))]
-    )
+import numpy as np
+
+
+class Dish:
+    """
+    Rounded rocks as a flat boolean array over the dish. Every tilt
+    direction has a precomputed segment id (the run of non-cube cells a
+    tile belongs to along the tilt axis) and a rank (distance from the end
+    of the run the rocks roll to), so a tilt is a bincount of the rocks
+    per segment followed by `rank < count[segment]`, without rotating.
+
+    """
+
+    def __init__(self, rows: list[str]):
+        self.height = len(rows)
+        self.width = len(rows[0])
+        grid = np.frombuffer("".join(rows).encode(), dtype=np.uint8)
+        grid = grid.reshape(self.height, self.width)
+        self.cubes = grid == ord("#")
+        self.rocks = (grid == ord("O")).ravel()
+
+        # views of the flat indices in which the rocks roll towards column 0
+        index = np.arange(self.height * self.width).reshape(
+            self.height, self.width
+        )
+        self.tilts = {
+            "north": self.segments(index.T),
+            "west": self.segments(index),
+            "south": self.segments(index.T[:, ::-1]),
+            "east": self.segments(index[:, ::-1]),
+        }
+
+    def segments(self, view: np.ndarray) -> tuple[np.ndarray, np.ndarray, int]:
+        cubes = self.cubes.ravel()[view]
+        starts = ~cubes
+        starts[:, 1:] &= cubes[:, :-1]
+        segment = np.cumsum(starts.ravel()) - 1
+        num_segments = int(starts.sum())
+        position = np.arange(segment.size)
+        segment_start = np.maximum.accumulate(np.where(starts.ravel(), position, 0))
+        rank = position - segment_start
+        # cube tiles go to an extra, always empty, segment
+        segment[cubes.ravel()] = num_segments
+        rank[cubes.ravel()] = segment.size
+
+        flat_segment = np.empty_like(segment)
+        flat_rank = np.empty_like(rank)
+        flat_segment[view.ravel()] = segment
+        flat_rank[view.ravel()] = rank
+        return flat_segment, flat_rank, num_segments
+
+    def tilt(self, direction: str):
+        segment, rank, num_segments = self.tilts[direction]
+        counts = np.bincount(segment[self.rocks], minlength=num_segments + 1)
+        counts[num_segments] = 0
+        np.less(rank, counts[segment], out=self.rocks)
+
+    def cycle(self):
+        for direction in ("north", "west", "south", "east"):
+            self.tilt(direction)
+
+    def load(self) -> int:
+        rows = np.flatnonzero(self.rocks) // self.width
+        return int((self.height - rows).sum())
+
+    def state(self) -> bytes:
+        return np.packbits(self.rocks).tobytes()
+
+    def rows(self) -> list[str]:
+        grid = np.full(self.height * self.width, ord("."), dtype=np.uint8)
+        grid[self.cubes.ravel()] = ord("#")
+        grid[self.rocks] = ord("O")
+        return [
+            grid[i : i + self.width].tobytes().decode()
+            for i in range(0, grid.size, self.width)
+        ]
 
 
 def print_matrix(matrix: list[str]) -> None:
@@ -64,51 +84,45 @@ def print_matrix(matrix: list[str]) -> None:
         print(row)
 
 
-def cycle_matrix(matrix: list[str]) -> int:
-    matrix = tilt_north(matrix)
-    matrix = tilt_west(matrix)
-    matrix = tilt_south(matrix)
-    matrix = tilt_east(matrix)
-    return matrix
+def find_offset_period(dish: Dish) -> tuple[int, int, list[int]]:
+    """
+    Cycle the dish until an exact state repeats. Returns the offset and
+    period of the repetition and the load after every cycle seen so far.
 
-
-def find_offset_period(matrix: list[str]) -> int:
-    seen = []
-    seen.append(hash(tuple(matrix)))
+    """
+    seen = {}
+    loads = []
     while True:
-        matrix = cycle_matrix(matrix)
-        h = hash(tuple(matrix))
-        if h in seen:
-            return (seen.index(h), len(seen) - seen.index(h))
-        seen.append(h)
+        state = dish.state()
+        if state in seen:
+            offset = seen[state]
+            return (offset, len(loads) - offset, loads)
+        seen[state] = len(loads)
+        loads.append(dish.load())
+        dish.cycle()
+
+
+def load_after_cycles(
+    cycles: int, offset: int, period: int, loads: list[int]
+) -> int:
+    if cycles < len(loads):
+        return loads[cycles]
+    return loads[offset + (cycles - offset) % period]
 
 
 def main(input_file: typer.FileText):
     dish = input_file.read().strip().split("\n")
 
-    print_matrix(dish)
-    print()
-    d = tilt_north(dish)
-    print_matrix(d)
+    d = Dish(dish)
+    d.tilt("north")
 
-    print(f"Part 1: load: {get_load(d)}")
+    print(f"Part 1: load: {d.load()}")
 
-    offset, period = find_offset_period(dish)
+    offset, period, loads = find_offset_period(Dish(dish))
     print(f"offset: {offset}, period: {period}")
-    
-    d = dish
-    print(f"Cycling for {offset} times")
-    for _ in range(offset):
-        d = cycle_matrix(d)
-
-    print(f"Cycling for {(1000000000 - offset) % period} times")
-    for _ in range((1000000000 - offset) % period):
-        d = cycle_matrix(d)
-
-    print("Final state:")
-    print_matrix(d)
 
-    print(f"Part 2: load: {get_load(d)}")
+    load = load_after_cycles(1000000000, offset, period, loads)
+    print(f"Part 2: load: {load}")
 
 
 if __name__ == "__main__":
@@ -7,6 +7,8 @@ from rich.progress import track, Progress
 
 from multiprocessing import Pool, freeze_support
 
+import numpy as np
+
 FORMAT = "%(message)s"
 logging.basicConfig(
     level="DEBUG", format=FORMAT, datefmt="[%X]", handlers=[RichHandler()]
@@ -16,14 +18,32 @@ log = logging.getLogger("rich")
 
 def clac_hash(string: str) -> int:
     current_value = 0
-    for c in string:
-        current_value += ord(c)
-        current_value *= 17
-        current_value %= 256
-    log.debug(f"{string} -> {current_value}")
+    for c in string.encode():
+        current_value = (current_value + c) * 17 & 0xFF
     return current_value
 
 
+# 17^k mod 256 == 1 + 16k mod 256, so the powers repeat every 16
+POW17 = np.array([pow(17, k, 256) for k in range(16)], dtype=np.int64)
+
+
+def hash_steps(line: str) -> np.ndarray:
+    """
+    HASH of every comma separated step in line. Unrolled, the HASH of
+    c_0 .. c_{n-1} is sum(c_i * 17^(n - i)) mod 256, so it is a weighted
+    sum over the byte buffer per step.
+
+    """
+    data = np.frombuffer(line.encode(), dtype=np.uint8)
+    comma = data == ord(",")
+    step = np.cumsum(comma)
+    ends = np.append(np.flatnonzero(comma), data.size)
+    position = np.arange(data.size)
+    weights = data * POW17[(ends[step] - position) % 16]
+    sums = np.bincount(step[~comma], weights=weights[~comma], minlength=ends.size)
+    return sums.astype(np.int64) % 256
+
+
 def calc_focussing_power(boxes: list) -> int:
     fp_sum = 0
     for i, box in enumerate(boxes):
@@ -56,31 +76,23 @@ def main(
     line = input_file.read().strip().replace("\n", "").replace("\r", "")
 
     if part1:
-        current_value = 0
-        for step in track(line.split(",")):
-            current_value += clac_hash(step)
+        current_value = int(hash_steps(line).sum())
         log.info(f"Part1: {current_value}")
 
     if part2:
-        boxes = [None] * 256
-        for step in track(line.split(",")):
-            if "-" in step:
-                lens = step.split("-")[0]
-                box = clac_hash(lens)
-                if boxes[box] and lens in boxes[box]:
-                    boxes[box].pop(lens)
-                log.debug(f"Step: {step} -> Box {box}: {boxes[box]}")
-            elif "=" in step:
-                lens = step.split("=")[0]
-                strength = int(step.split("=")[1])
-                box = clac_hash(lens)
-                if not boxes[box]:
-                    boxes[box] = {}
-                boxes[box][lens] = strength
-                log.debug(f"Step: {step} -> Box {box}: {boxes[box]}")
+        steps = re.findall(r"([^,=-]*)([=-])(\d*)", line)
+        if len(steps) != line.count(",") + 1:
+            raise ValueError(f"Unknown step in: {line}")
+        lens_boxes = hash_steps(",".join(lens for lens, _, _ in steps)).tolist()
+        # dicts keep insertion order, which is the slot order
+        boxes = [{} for _ in range(256)]
+        for (lens, op, strength), box in zip(steps, lens_boxes):
+            if op == "-":
+                boxes[box].pop(lens, None)
             else:
-                raise ValueError(f"Unknown step: {step}")
-        print_boxes(boxes)
+                boxes[box][lens] = int(strength)
+        if log.isEnabledFor(logging.DEBUG):
+            print_boxes(boxes)
         fp = calc_focussing_power(boxes)
         log.info(f"Part2: {fp}")
 
@@ -9,6 +9,8 @@ from enum import Enum
 
 from multiprocessing import Pool, freeze_support
 
+import numpy as np
+
 FORMAT = "%(message)s"
 logging.basicConfig(
     level="DEBUG", format=FORMAT, datefmt="[%X]", handlers=[RichHandler()]
@@ -23,103 +25,308 @@ class Heading(Enum):
     WEST = 3
 
 
-def new_pos(pos: tuple[int], heading: Heading) -> tuple[int]:
-    if heading == Heading.NORTH:
-        return (pos[0] - 1, pos[1])
-    elif heading == Heading.EAST:
-        return (pos[0], pos[1] + 1)
-    elif heading == Heading.SOUTH:
-        return (pos[0] + 1, pos[1])
-    elif heading == Heading.WEST:
-        return (pos[0], pos[1] - 1)
+def build_turn_table() -> dict[str, tuple[tuple[int]]]:
+    # for every tile: incoming heading -> outgoing headings
+    north, east, south, west = (h.value for h in Heading)
+    return {
+        ".": ((north,), (east,), (south,), (west,)),
+        "/": ((east,), (north,), (west,), (south,)),
+        "\\": ((west,), (south,), (east,), (north,)),
+        "|": ((north,), (north, south), (south,), (north, south)),
+        "-": ((east, west), (east,), (east, west), (west,)),
+    }
 
 
-def print_energized(layout: list[str], positions: set[tuple]):
-    for i, row in enumerate(layout):
-        for j, col in enumerate(row):
-            if (i, j) in positions:
-                print("#", end="")
+TURNS = build_turn_table()
+
+
+class Contraption:
+    def __init__(self, layout: list[str]):
+        self.width = len(layout[0])
+        self.height = len(layout)
+        self.turns = [TURNS[c] for row in layout for c in row]
+        self.tiles = "".join(layout)
+
+    def energize(
+        self, pos: tuple[int] = (0, -1), heading: Heading = Heading.EAST
+    ) -> bytearray:
+        """
+        Follow the beam entering from `pos` (just outside the layout) and
+        return a bitmap with one byte per tile and one bit per heading the
+        tile was traversed in.
+
+        """
+        width = self.width
+        height = self.height
+        turns = self.turns
+        visited = bytearray(width * height)
+        stack = [(pos[0], pos[1], heading.value)]
+        while stack:
+            y, x, h = stack.pop()
+            while True:
+                if h == 0:
+                    y -= 1
+                elif h == 1:
+                    x += 1
+                elif h == 2:
+                    y += 1
+                else:
+                    x -= 1
+                if not (0 <= y < height and 0 <= x < width):
+                    break
+                i = y * width + x
+                bit = 1 << h
+                if visited[i] & bit:
+                    break
+                visited[i] |= bit
+                out = turns[i][h]
+                if len(out) == 2:
+                    stack.append((y, x, out[1]))
+                h = out[0]
+        return visited
+
+    def trace_segment(
+        self, y: int, x: int, h: int
+    ) -> tuple[list[int], list[tuple]]:
+        """
+        Follow a beam leaving (y, x) with heading h up to the next splitter
+        or the edge. Returns the covered tile indices and the (splitter
+        tile, heading) beams it continues as.
+
+        """
+        width = self.width
+        height = self.height
+        tiles = []
+        successors = []
+        while True:
+            if h == 0:
+                y -= 1
+            elif h == 1:
+                x += 1
+            elif h == 2:
+                y += 1
             else:
-                print(".", end="")
-        print()
+                x -= 1
+            if not (0 <= y < height and 0 <= x < width):
+                break
+            i = y * width + x
+            tiles.append(i)
+            if self.tiles[i] in "|-":
+                # passing a splitter edge-on is the same beam as the one it
+                # emits in that direction, so every segment ends here
+                successors = [(i, out) for out in self.turns[i][h]]
+                break
+            h = self.turns[i][h][0]
+        return tiles, successors
 
+    def splitter_beams(self) -> list[tuple[int, int]]:
+        beams = []
+        for i, c in enumerate(self.tiles):
+            if c == "|":
+                beams += [(i, Heading.NORTH.value), (i, Heading.SOUTH.value)]
+            elif c == "-":
+                beams += [(i, Heading.EAST.value), (i, Heading.WEST.value)]
+        return beams
 
-def num_tiles_traversed(
-    layout: list[str],
-    pos: tuple[int] = (0, -1),
-    heading: Heading = Heading.EAST,
-    positions_traversed: set[tuple] | None = None,
-) -> set[tuple[int]]:
-    width = len(layout[0])
-    height = len(layout)
+    def edge_entries(self) -> list[tuple[int, int, int]]:
+        entries = []
+        for y in range(self.height):
+            entries.append((y, -1, Heading.EAST.value))
+            entries.append((y, self.width, Heading.WEST.value))
+        for x in range(self.width):
+            entries.append((-1, x, Heading.SOUTH.value))
+            entries.append((self.height, x, Heading.NORTH.value))
+        return entries
 
-    if positions_traversed is None:
-        positions_traversed = set()
 
-    while True:
-        pos = new_pos(pos, heading)
-        if pos[0] < 0 or pos[0] >= height or pos[1] < 0 or pos[1] >= width:
-            log.debug(
-                f"Out of bounds, positions traversed: {len(positions_traversed)}"
-            )
-            break
-        if (pos, heading) in positions_traversed:
-            log.debug(
-                f"Loop detected, positions traversed: {len(positions_traversed)}"
+def tiles_to_bitset(tiles: list[int]) -> int:
+    if not tiles:
+        return 0
+    low = min(tiles)
+    bits = np.zeros(max(tiles) - low + 1, dtype=bool)
+    bits[np.array(tiles) - low] = True
+    packed = np.packbits(bits, bitorder="little").tobytes()
+    return int.from_bytes(packed, "little") << low
+
+
+def strongly_connected_components(edges: list[list[int]]) -> list[list[int]]:
+    """
+    Iterative Tarjan. Components come out in reverse topological order:
+    every component is emitted after all components reachable from it.
+
+    """
+    index = [-1] * len(edges)
+    low = [0] * len(edges)
+    on_stack = [False] * len(edges)
+    stack = []
+    components = []
+    counter = 0
+    for root in range(len(edges)):
+        if index[root] >= 0:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, i = work.pop()
+            if i == 0:
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            if i < len(edges[v]):
+                work.append((v, i + 1))
+                w = edges[v][i]
+                if index[w] < 0:
+                    work.append((w, 0))
+                elif on_stack[w]:
+                    low[v] = min(low[v], index[w])
+                continue
+            if low[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component.append(w)
+                    if w == v:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[v])
+    return components
+
+
+worker_contraption = None
+
+
+def init_segment_worker(contraption: Contraption):
+    global worker_contraption
+    worker_contraption = contraption
+
+
+def segment_worker(start: tuple[int, int, int]) -> tuple[list[int], list[tuple]]:
+    return worker_contraption.trace_segment(*start)
+
+
+def max_energized(contraption: Contraption, nproc: int = 1) -> int:
+    """
+    Energized tile count of the best edge entry, using a graph of beam
+    segments between splitters: each entry is its own first segment plus
+    the union of everything reachable from the splitter beams it runs
+    into. Unions are built per strongly connected component, only for
+    components the entries reach, and freed after their last use.
+
+    """
+    beams = contraption.splitter_beams()
+    beam_ids = {beam: n for n, beam in enumerate(beams)}
+    entries = contraption.edge_entries()
+    width = contraption.width
+    starts = [(i // width, i % width, h) for i, h in beams] + entries
+
+    if nproc > 1:
+        with Pool(
+            processes=nproc,
+            initializer=init_segment_worker,
+            initargs=(contraption,),
+        ) as p:
+            chunksize = max(1, len(starts) // (nproc * 4))
+            segments = p.map(segment_worker, starts, chunksize)
+    else:
+        segments = [contraption.trace_segment(*start) for start in starts]
+
+    beam_segments = segments[: len(beams)]
+    entry_segments = segments[len(beams) :]
+    edges = [
+        [beam_ids[successor] for successor in successors]
+        for _, successors in beam_segments
+    ]
+
+    components = strongly_connected_components(edges)
+    component_of = [0] * len(beams)
+    for c, component in enumerate(components):
+        for beam in component:
+            component_of[beam] = c
+    component_edges = []
+    for c, component in enumerate(components):
+        component_edges.append(
+            {
+                component_of[successor]
+                for beam in component
+                for successor in edges[beam]
+                if component_of[successor] != c
+            }
+        )
+    entry_components = [
+        {component_of[beam_ids[successor]] for successor in successors}
+        for _, successors in entry_segments
+    ]
+
+    # only components some edge entry runs into need a union
+    needed = [False] * len(components)
+    stack = [c for cs in entry_components for c in cs]
+    while stack:
+        c = stack.pop()
+        if not needed[c]:
+            needed[c] = True
+            stack.extend(component_edges[c])
+
+    # a union is dropped once its last consumer, a component or an entry,
+    # has used it; components come out with their successors first, so an
+    # entry is scored right after its last component
+    consumers = [0] * len(components)
+    for c in range(len(components)):
+        if needed[c]:
+            for successor in component_edges[c]:
+                consumers[successor] += 1
+    entries_after = [[] for _ in components]
+    best = 0
+    for (segment, _), cs in zip(entry_segments, entry_components):
+        for c in cs:
+            consumers[c] += 1
+        if cs:
+            entries_after[max(cs)].append((segment, cs))
+        else:
+            # a beam can cross its own path on an empty tile
+            best = max(best, len(set(segment)))
+
+    reachable = {}
+
+    def consume(c: int) -> int:
+        tiles = reachable[c]
+        consumers[c] -= 1
+        if not consumers[c]:
+            del reachable[c]
+        return tiles
+
+    for c, component in enumerate(components):
+        if needed[c]:
+            tiles = 0
+            for beam in component:
+                tiles |= tiles_to_bitset(beam_segments[beam][0])
+            for successor in component_edges[c]:
+                tiles |= consume(successor)
+            reachable[c] = tiles
+        for segment, cs in entries_after[c]:
+            # a bitset spans every row between its first and last tile, so
+            # segments stay tile lists until they are scored
+            tiles = tiles_to_bitset(segment)
+            for successor in cs:
+                tiles |= consume(successor)
+            best = max(best, tiles.bit_count())
+    return best
+
+
+def num_energized(visited: bytearray) -> int:
+    return int(np.count_nonzero(np.frombuffer(visited, dtype=np.uint8)))
+
+
+def print_energized(layout: list[str], visited: bytearray):
+    width = len(layout[0])
+    for i, row in enumerate(layout):
+        print(
+            "".join(
+                "#" if visited[i * width + j] else "." for j in range(width)
             )
-            break
-        log.debug(f"New pos: {pos} ({heading} {layout[pos[0]][pos[1]]})")
-        positions_traversed.add((pos, heading))
-        if heading == Heading.NORTH:
-            if layout[pos[0]][pos[1]] == "-":
-                positions_traversed.update(
-                    num_tiles_traversed(
-                        layout, pos, Heading.WEST, positions_traversed
-                    )
-                )
-                heading = Heading.EAST
-            elif layout[pos[0]][pos[1]] == "/":
-                heading = Heading.EAST
-            elif layout[pos[0]][pos[1]] == "\\":
-                heading = Heading.WEST
-        elif heading == Heading.EAST:
-            if layout[pos[0]][pos[1]] == "|":
-                positions_traversed.update(
-                    num_tiles_traversed(
-                        layout, pos, Heading.NORTH, positions_traversed
-                    )
-                )
-                heading = Heading.SOUTH
-            elif layout[pos[0]][pos[1]] == "/":
-                heading = Heading.NORTH
-            elif layout[pos[0]][pos[1]] == "\\":
-                heading = Heading.SOUTH
-        elif heading == Heading.SOUTH:
-            if layout[pos[0]][pos[1]] == "-":
-                positions_traversed.update(
-                    num_tiles_traversed(
-                        layout, pos, Heading.WEST, positions_traversed
-                    )
-                )
-                heading = Heading.EAST
-            elif layout[pos[0]][pos[1]] == "/":
-                heading = Heading.WEST
-            elif layout[pos[0]][pos[1]] == "\\":
-                heading = Heading.EAST
-        elif heading == Heading.WEST:
-            if layout[pos[0]][pos[1]] == "|":
-                positions_traversed.update(
-                    num_tiles_traversed(
-                        layout, pos, Heading.NORTH, positions_traversed
-                    )
-                )
-                heading = Heading.SOUTH
-            elif layout[pos[0]][pos[1]] == "/":
-                heading = Heading.SOUTH
-            elif layout[pos[0]][pos[1]] == "\\":
-                heading = Heading.NORTH
-
-    return positions_traversed
+        )
 
 
 def main(
@@ -127,55 +334,22 @@ def main(
     log_level: str = "INFO",
     part1: bool = True,
     part2: bool = True,
+    nproc: int = 1,
 ):
     log.setLevel(log_level)
     layout = input_file.read().strip().split("\n")
 
+    contraption = Contraption(layout)
+
     if part1:
-        positions_traversed = num_tiles_traversed(layout)
-        positions_traversed = {pos for pos, heading in positions_traversed}
-        print_energized(layout, positions_traversed)
-        num_tiles = len(positions_traversed)
+        visited = contraption.energize()
+        if log.isEnabledFor(logging.DEBUG):
+            print_energized(layout, visited)
+        num_tiles = num_energized(visited)
         log.info(f"Part 1: {num_tiles}")
 
     if part2:
-        positions_traversed = set()
-        width = len(layout[0])
-        height = len(layout)
-        pt_max = 0
-        for y in track(
-            range(height),
-            description="Traversing with light from top to bottom",
-        ):
-            positions_traversed = num_tiles_traversed(
-                layout, (y, -1), Heading.EAST
-            )
-            pt_max = max(
-                pt_max, len(set({pos for pos, heading in positions_traversed}))
-            )
-            positions_traversed = num_tiles_traversed(
-                layout, (y, width), Heading.WEST
-            )
-            pt_max = max(
-                pt_max, len(set({pos for pos, heading in positions_traversed}))
-            )
-        for x in track(
-            range(width),
-            description="Traversing with light from left to right",
-        ):
-            positions_traversed = num_tiles_traversed(
-                layout, (-1, x), Heading.SOUTH
-            )
-            pt_max = max(
-                pt_max, len(set({pos for pos, heading in positions_traversed}))
-            )
-            positions_traversed = num_tiles_traversed(
-                layout, (height, x), Heading.NORTH
-            )
-            pt_max = max(
-                pt_max, len(set({pos for pos, heading in positions_traversed}))
-            )
-        # num_tiles = len(positions_traversed)
+        pt_max = max_energized(contraption, nproc)
         log.info(f"Part 2: {pt_max}")
 
 
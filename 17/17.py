@@ -16,106 +16,85 @@ logging.basicConfig(
 log = logging.getLogger("rich")
 
 
-class Heading(Enum):
-    NORTH = 0
-    EAST = 1
-    SOUTH = 2
-    WEST = 3
-
-
-def new_pos(pos: tuple[int], heading: Heading) -> tuple[int]:
-    if heading == Heading.NORTH:
-        return (pos[0] - 1, pos[1])
-    elif heading == Heading.EAST:
-        return (pos[0], pos[1] + 1)
-    elif heading == Heading.SOUTH:
-        return (pos[0] + 1, pos[1])
-    elif heading == Heading.WEST:
-        return (pos[0], pos[1] - 1)
-
-
-def get_val(layout: list[str], pos: tuple[int]) -> str:
-    return layout[pos[0]][pos[1]]
-
-
-def get_left_heading(heading: Heading) -> Heading:
-    return Heading((heading.value - 1) % 4)
-
-
-def get_right_heading(heading: Heading) -> Heading:
-    return Heading((heading.value + 1) % 4)
-
-
-def get_next_nodes(
-    layout: list[str],
-    pos: tuple[int],
-    heading: Heading,
-    line_len: int,
-    line_len_min_max: tuple[int] = (0, 3),
-) -> list[tuple[int]]:
-    width = len(layout[0])
-    height = len(layout)
-
-    next_nodes = []
-
-    if line_len < line_len_min_max[1]:
-        next_nodes.append((new_pos(pos, heading), heading, line_len + 1))
-
-    if line_len >= line_len_min_max[0]:
-        rheading = get_right_heading(heading)
-        next_nodes.append((new_pos(pos, rheading), rheading, 1))
-        lheading = get_left_heading(heading)
-        next_nodes.append((new_pos(pos, lheading), lheading, 1))
-
-    filtered_nodes = []
-    for npos, nheading, nline_len in next_nodes:
-        if npos[0] < 0 or npos[0] >= height or npos[1] < 0 or npos[1] >= width:
-            continue
-        filtered_nodes.append((npos, nheading, nline_len))
-
-    return filtered_nodes
-
-
 def find_shortest_path(
-    layout: list[str], line_len_min_max: tuple[int] = (0, 3)
+    layout: list[list[int]],
+    line_len_min_max: tuple[int] = (0, 3),
+    heuristic: bool = True,
 ) -> int:
-    traversed = {
-        ((0, 0), Heading.EAST, 0): 0,
-        ((0, 0), Heading.NORTH, 0): 0,
-        ((0, 0), Heading.WEST, 0): 0,
-        ((0, 0), Heading.SOUTH, 0): 0,
-    }
-    pos = (0, 0)
-    line_len = 0
-
-    queue = [(pos, Heading.EAST, 0), (pos, Heading.SOUTH, 0)]
-    while queue:
-        current_node = queue.pop(0)
-        next_nodes = get_next_nodes(layout, *current_node, line_len_min_max)
-
-        for n in next_nodes:
-            n_pos = n[0]
-            n_y = n_pos[0]
-            n_x = n_pos[1]
-            val = traversed[current_node] + layout[n_y][n_x]
-            if n not in traversed:
-                traversed[n] = val
-                queue.append(n)
-            elif traversed[n] > val:
-                traversed[n] = val
-                queue.append(n)
-
-    end_pos = (len(layout) - 1, len(layout[0]) - 1)
-
-    end_nodes = []
-    for heading in Heading:
-        for line_len in range(line_len_min_max[0], line_len_min_max[1] + 1):
-            if (end_pos, heading, line_len) in traversed:
-                log.debug(
-                    f"{end_pos} {heading} {line_len} {traversed[(end_pos, heading, line_len)]}"
-                )
-                end_nodes.append(traversed[(end_pos, heading, line_len)])
-    return min(end_nodes)
+    """
+    Dijkstra (A* with `heuristic`) over states packed as cell * 2 + axis,
+    where axis is the direction of the last straight line: 0 vertical, 1
+    horizontal. Every move turns and then runs a whole straight line, so
+    line lengths need no state of their own. Heat losses are small integers,
+    so a circular bucket queue replaces the heap.
+
+    """
+    height = len(layout)
+    width = len(layout[0])
+    heat = [h for row in layout for h in row]
+    target = height * width - 1
+    min_len = max(1, line_len_min_max[0])
+    max_len = line_len_min_max[1]
+
+    if heuristic:
+        # every tile costs at least 1, so Manhattan distance is consistent
+        remaining = [
+            (height - 1 - y) + (width - 1 - x)
+            for y in range(height)
+            for x in range(width)
+        ]
+    else:
+        remaining = [0] * (height * width)
+
+    inf = math.inf
+    dist = [inf] * (2 * height * width)
+    # reduced edge costs are at most 9 * max_len + max_len
+    num_buckets = 10 * max_len + 1
+    buckets = [[] for _ in range(num_buckets)]
+    pending = 0
+    for start in (0, 1):
+        dist[start] = 0
+        buckets[remaining[0] % num_buckets].append(start)
+        pending += 1
+
+    f = remaining[0]
+    while pending:
+        bucket = buckets[f % num_buckets]
+        while bucket:
+            node = bucket.pop()
+            pending -= 1
+            cell = node >> 1
+            g = dist[node]
+            if g + remaining[cell] != f:
+                continue
+            if cell == target:
+                return g
+            y, x = divmod(cell, width)
+            axis = (node & 1) ^ 1
+            for sign in (1, -1):
+                if axis:
+                    step = sign
+                    steps_left = (width - 1 - x) if sign > 0 else x
+                else:
+                    step = sign * width
+                    steps_left = (height - 1 - y) if sign > 0 else y
+                cost = g
+                next_cell = cell
+                for line_len in range(1, min(max_len, steps_left) + 1):
+                    next_cell += step
+                    cost += heat[next_cell]
+                    if line_len < min_len:
+                        continue
+                    next_node = (next_cell << 1) | axis
+                    if cost < dist[next_node]:
+                        dist[next_node] = cost
+                        buckets[(cost + remaining[next_cell]) % num_buckets].append(
+                            next_node
+                        )
+                        pending += 1
+        f += 1
+
+    raise ValueError("No path to the bottom right found")
 
 
 def main(
@@ -123,6 +102,7 @@ def main(
     log_level: str = "INFO",
     part1: bool = True,
     part2: bool = True,
+    astar: bool = True,
 ):
     log.setLevel(log_level)
     layout = [
@@ -130,11 +110,11 @@ def main(
     ]
 
     if part1:
-        heat_loss = find_shortest_path(layout)
+        heat_loss = find_shortest_path(layout, heuristic=astar)
         log.info(f"Part 1: {heat_loss}")
 
     if part2:
-        heat_loss = find_shortest_path(layout, (4, 10))
+        heat_loss = find_shortest_path(layout, (4, 10), astar)
         log.info(f"Part 2: {heat_loss}")
 
 
@@ -9,117 +9,60 @@ from enum import Enum
 
 from itertools import pairwise
 
-import numpy as np
 
+FORMAT = "%(message)s"
+logging.basicConfig(
+    level="DEBUG", format=FORMAT, datefmt="[%X]", handlers=[RichHandler()]
+)
+log = logging.getLogger("rich")
 
-def polygon_area(vertices):
+
+# (dx, dy) per direction letter, and the digit encoding used in part 2
+DIRECTIONS = {"R": (1, 0), "D": (0, 1), "L": (-1, 0), "U": (0, -1)}
+DIGIT_DIRECTIONS = {"0": "R", "1": "D", "2": "L", "3": "U"}
+
+
+class DigArea:
     """
-    Return the area of the polygon enclosed by vertices using the shoelace
-    algorithm.
+    Streaming lagoon size: keeps only the current position, the shoelace
+    sum and the perimeter, all exact Python ints.
 
     """
 
-    a = np.vstack((vertices, vertices[0]))
-    S1 = sum(a[:-1, 0] * a[1:, 1])
-    S2 = sum(a[:-1, 1] * a[1:, 0])
-    return abs(S1 - S2) / 2
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.double_area = 0
+        self.perimeter = 0
 
+    def dig(self, direction: str, distance: int):
+        dx, dy = DIRECTIONS[direction]
+        # shoelace term x_i * y_{i+1} - x_{i+1} * y_i for this edge
+        self.double_area += distance * (self.x * dy - self.y * dx)
+        self.x += dx * distance
+        self.y += dy * distance
+        self.perimeter += distance
 
-FORMAT = "%(message)s"
-logging.basicConfig(
-    level="DEBUG", format=FORMAT, datefmt="[%X]", handlers=[RichHandler()]
-)
-log = logging.getLogger("rich")
+    def lagoon_size(self) -> int:
+        # Pick's theorem: interior = A - b / 2 + 1, plus the b trench tiles
+        return (abs(self.double_area) + self.perimeter) // 2 + 1
 
 
-class Heading(Enum):
-    NORTH = 0
-    EAST = 1
-    SOUTH = 2
-    WEST = 3
-
-
-def int_to_heading(direction: int) -> Heading:
-    return Heading((direction + 1) % 4)
-
-
-def get_left_heading(heading: Heading) -> Heading:
-    return Heading((heading.value - 1) % 4)
-
-
-def get_right_heading(heading: Heading) -> Heading:
-    return Heading((heading.value + 1) % 4)
-
-
-def direction_to_heading(direction: str) -> Heading:
-    if direction == "R":
-        return Heading.EAST
-    elif direction == "L":
-        return Heading.WEST
-    elif direction == "U":
-        return Heading.NORTH
-    elif direction == "D":
-        return Heading.SOUTH
-
-
-def walk_direction(
-    pos: tuple[int],
-    prev_heading: Heading,
-    heading: Heading,
-    next_heading: Heading,
-    distance: int,
-) -> tuple[int]:
-    if prev_heading:
-        rheading = get_right_heading(prev_heading)
-        lheading = get_left_heading(prev_heading)
-        if heading == lheading:
-            log.debug(f"Went left last time, so distance -= 1")
-            distance -= 1
-    if next_heading:
-        rheading = get_right_heading(heading)
-        lheading = get_left_heading(heading)
-        if next_heading == rheading:
-            log.debug(f"Going right next time, so distance += 1")
-            distance += 1
-    if heading == Heading.EAST:
-        pos = (pos[0], pos[1] + distance)
-    elif heading == Heading.WEST:
-        pos = (pos[0], pos[1] - distance)
-    elif heading == Heading.NORTH:
-        pos = (pos[0] - distance, pos[1])
-    elif heading == Heading.SOUTH:
-        pos = (pos[0] + distance, pos[1])
-
-    return pos
-
-
-def loop_area(plan: list[tuple]) -> int:
-    pos = (0, 0)
-
-    vertces = [pos]
-
-    h = [heading for heading, _ in plan] + [plan[0][0]]
-    headings = zip(h[:-1], h[1:])
-    distances = [distance for _, distance in plan]
-    p = zip(headings, distances)
-    prev_heading = plan[0][0]
-    for (heading, next_heading), distance in track(
-        p, description="Walking path"
-    ):
-        log.debug(
-            f"pos: {pos}, "
-            f"prev_heading: {prev_heading.name}, "
-            f"heading: {heading.name}, "
-            f"next_heading: {next_heading}, "
-            f"distance: {distance}"
-        )
-        pos = walk_direction(
-            pos, prev_heading, heading, next_heading, distance
-        )
-        vertces.append(pos)
-        prev_heading = heading
+def parse_plan(rows):
+    """
+    Yield the part 1 and part 2 (direction, distance) of every row.
 
-    return int(polygon_area(vertces))
+    """
+    for row in rows:
+        row = row.strip()
+        if not row:
+            continue
+        direction, distance, color = row.split(" ")
+        color = color.strip("(#)")
+        yield (
+            (direction, int(distance)),
+            (DIGIT_DIRECTIONS[color[-1]], int(color[:-1], 16)),
+        )
 
 
 def main(
@@ -129,30 +72,18 @@ def main(
     part2: bool = True,
 ):
     log.setLevel(log_level)
-    rows = input_file.read().strip().split("\n")
+
+    area_part1 = DigArea()
+    area_part2 = DigArea()
+    for instruction_part1, instruction_part2 in parse_plan(input_file):
+        area_part1.dig(*instruction_part1)
+        area_part2.dig(*instruction_part2)
 
     if part1:
-        dig_plan = [
-            (
-                direction_to_heading(row.split(" ")[0]),
-                int(row.split(" ")[1]),
-            )
-            for row in rows
-        ]
-        area = loop_area(dig_plan)
-        log.info(f"Part 1: {area}")
+        log.info(f"Part 1: {area_part1.lagoon_size()}")
 
     if part2:
-        dig_plan = [
-            (
-                int_to_heading(int(row.split(" ")[2].strip("(#)")[-1])),
-                int(row.split(" ")[2].strip("(#)")[:-1], 16),
-            )
-            for row in rows
-        ]
-        distances = [distance for _, distance in dig_plan]
-        area = loop_area(dig_plan)
-        log.info(f"Part 1: {area}")
+        log.info(f"Part 2: {area_part2.lagoon_size()}")
 
 
 if __name__ == "__main__":
@@ -86,7 +86,7 @@ def parse_rule(rules: dict[str, str]) -> dict[str, list]:
                     cond = cond.split("<")
                     var = cond[0]
                     max_val = int(cond[1]) - 1
-                    cond = Condition(var, 0, max_val, tgt)
+                    cond = Condition(var, -math.inf, max_val, tgt)
                 elif ">" in cond:
                     cond = cond.split(">")
                     var = cond[0]
@@ -101,62 +101,6 @@ def parse_rule(rules: dict[str, str]) -> dict[str, list]:
         rules_parsed[name] = conditions
     return rules_parsed
 
-def calc_accepted(conditions :dict[str, Condition]):
-    accepted = 1
-    for cond in conditions.values():
-        accepted *= cond.max - cond.min + 1
-    return accepted
-
-def get_num_accepted(
-    rule_key: str,
-    rules: dict[str, list],
-    prev_conditions: dict[str, Condition],
-) -> int:
-    num_accepted = 0
-    rule = rules[rule_key]
-    log.debug(f"Prev conditions: {prev_conditions}")
-    log.debug(f"Rule: {rule}")
-
-    conditions = prev_conditions.copy()
-    for cond in rule:
-        log.debug(f"Rule {rule_key}: condition: {cond}")
-        if cond.var:
-            intersection = conditions[cond.var].intersection(cond)
-            if intersection:
-                conditions_int = conditions.copy()
-                conditions_int[cond.var].min = intersection.min
-                conditions_int[cond.var].max = intersection.max
-            
-                remaining = conditions[cond.var] - cond
-                conditions = conditions.copy()
-                conditions[cond.var].min = remaining.min
-                conditions[cond.var].max = remaining.max
-        else:
-            intersection = cond
-            conditions_int = conditions.copy()
-            conditions = [None] * len(conditions)
-
-        if intersection:
-            rule_key = cond.tgt
-            if cond.tgt == "R":
-                continue
-
-
-            if cond.tgt == "A":
-                num_accepted += calc_accepted(conditions_int)
-                continue
-            
-            if not cond.tgt:
-                num_accepted += get_num_accepted(cond.tgt, rules, conditions_int)
-                continue
-            
-            num_accepted += get_num_accepted(cond.tgt, rules, conditions_int)
-
-        if None in conditions:
-            return num_accepted 
-    return num_accepted
-
-
 def check_part(parts: dict[str, int], rules: dict[str, list]) -> int:
     tgt = "in"
     while True:
@@ -172,6 +116,122 @@ def check_part(parts: dict[str, int], rules: dict[str, list]) -> int:
     raise ValueError(f"Unknown target {tgt}")
 
 
+XMAS = "xmas"
+# one inclusive (min, max) rating range per variable in XMAS
+Box = tuple[tuple[int, int], ...]
+PART_DTYPE = np.dtype([(var, np.int64) for var in XMAS])
+# bounds used in place of -math.inf and math.inf in the NumPy tables
+MIN_RATING = np.iinfo(np.int64).min
+MAX_RATING = np.iinfo(np.int64).max
+
+
+class CompiledWorkflows:
+    """
+    Workflows flattened into one decision table. Workflow w owns rules
+    first_rule[w] .. first_rule[w + 1] - 1; rule r sends a part to
+    target[r] when lo[r] <= rating[var[r]] <= hi[r] (var -1 always
+    matches). One-sided rules keep -math.inf or math.inf as their open
+    bound, so box splitting is exact for any int domain; only the NumPy
+    tables in accepted clamp them to int64. Workflow ids past the real
+    workflows are ACCEPT and REJECT.
+
+    """
+
+    def __init__(self, rules: dict[str, list]):
+        names = list(rules)
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.accept = len(names)
+        self.reject = len(names) + 1
+        self.ids["A"] = self.accept
+        self.ids["R"] = self.reject
+
+        self.first_rule = []
+        self.var = []
+        self.lo = []
+        self.hi = []
+        self.target = []
+        for name in names:
+            self.first_rule.append(len(self.var))
+            for cond in rules[name]:
+                self.var.append(XMAS.index(cond.var) if cond.var else -1)
+                self.lo.append(cond.min)
+                self.hi.append(cond.max)
+                self.target.append(self.ids[cond.tgt])
+        # ACCEPT and REJECT have no rules
+        self.first_rule += [len(self.var), len(self.var)]
+
+    def accepted(self, parts: np.ndarray, start: str = "in") -> np.ndarray:
+        """
+        Run a structured array of parts through the workflows at once and
+        return a boolean mask of the accepted parts.
+
+        """
+        ratings = np.stack([parts[var] for var in XMAS], axis=1)
+        var = np.array(self.var, dtype=np.int64)
+        lo = np.array([max(b, MIN_RATING) for b in self.lo], dtype=np.int64)
+        hi = np.array([min(b, MAX_RATING) for b in self.hi], dtype=np.int64)
+        target = np.array(self.target, dtype=np.int64)
+        first_rule = np.array(self.first_rule, dtype=np.int64)
+
+        accepted = np.zeros(len(parts), dtype=bool)
+        active = np.arange(len(parts))
+        rule = np.full(len(parts), self.first_rule[self.ids[start]])
+        while active.size:
+            rule_var = var[rule]
+            rating = ratings[active, np.maximum(rule_var, 0)]
+            hit = (rule_var < 0) | ((lo[rule] <= rating) & (rating <= hi[rule]))
+            rule_target = target[rule]
+            done = hit & (rule_target >= self.accept)
+            accepted[active[done & (rule_target == self.accept)]] = True
+            next_rule = np.where(hit, first_rule[rule_target], rule + 1)
+            active = active[~done]
+            rule = next_rule[~done]
+        return accepted
+
+    def accepted_boxes(
+        self, domain: Box = ((1, 4000),) * 4, start: str = "in"
+    ) -> tuple[int, list[Box]]:
+        """
+        Split the domain box along the rules, without recursion, into the
+        disjoint boxes that end up accepted. Returns their total volume
+        and the boxes.
+
+        """
+        accepted = []
+        stack = [(domain, self.first_rule[self.ids[start]])]
+        while stack:
+            box, rule = stack.pop()
+            var = self.var[rule]
+            target = self.target[rule]
+            if var < 0:
+                matched = box
+            else:
+                lo, hi = box[var]
+                match_lo = max(lo, self.lo[rule])
+                match_hi = min(hi, self.hi[rule])
+                if match_lo <= match_hi:
+                    matched = box[:var] + ((match_lo, match_hi),) + box[var + 1 :]
+                    rests = ((lo, match_lo - 1), (match_hi + 1, hi))
+                else:
+                    matched = None
+                    rests = ((lo, hi),)
+                # whatever the rule does not match falls through to the next
+                for rest_lo, rest_hi in rests:
+                    if rest_lo <= rest_hi:
+                        rest = box[:var] + ((rest_lo, rest_hi),) + box[var + 1 :]
+                        stack.append((rest, rule + 1))
+
+            if matched is None or target == self.reject:
+                continue
+            if target == self.accept:
+                accepted.append(matched)
+            else:
+                stack.append((matched, self.first_rule[target]))
+
+        volume = sum(math.prod(hi - lo + 1 for lo, hi in box) for box in accepted)
+        return volume, accepted
+
+
 def main(
     input_file: typer.FileText,
     log_level: str = "INFO",
@@ -201,19 +261,20 @@ def main(
     rules = parse_rule(rules)
 
 
+    workflows = CompiledWorkflows(rules)
+
     if part1:
-        accepted_parts_sum = 0
-        for p in parts:
-            accepted_parts_sum += check_part(p, rules)
+        part_array = np.array(
+            [tuple(p[var] for var in XMAS) for p in parts], dtype=PART_DTYPE
+        )
+        accepted = part_array[workflows.accepted(part_array)]
+        accepted_parts_sum = int(sum(accepted[var].sum() for var in XMAS))
         log.info(f"Part 1: {accepted_parts_sum}")
 
     if part2:
-        accepted = 1
-        prev_conditions = {}
-        for var in "xmas":
-            prev_conditions[var] = Condition(var, 1, 4000, "in")
-        accepted_conditions = get_num_accepted("in", rules, prev_conditions)
-        log.info(f"Part 2: {accepted_conditions}")
+        accepted_volume, accepted_boxes = workflows.accepted_boxes()
+        log.debug(f"Accepted boxes: {len(accepted_boxes)}")
+        log.info(f"Part 2: {accepted_volume}")
 
 
 if __name__ == "__main__":
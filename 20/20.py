@@ -13,6 +13,8 @@ from itertools import pairwise
 
 import numpy as np
 
+from multiprocessing import Pool, freeze_support
+
 
 FORMAT = "%(message)s"
 logging.basicConfig(
@@ -21,121 +23,276 @@ logging.basicConfig(
 log = logging.getLogger("rich")
 
 
-class Module:
-    def __init__(self, name, next_modules):
-        self.name = name
-        self.next_modules = next_modules
-        self.symbol = "?"
-        self.inputs = []
-
-    def __repr__(self):
-        return f"{self.symbol}{self.name} -> {self.next_modules}"
-
-
-class FF(Module):
-    def __init__(self, name, next_modules):
-        super().__init__(name, next_modules)
-        self.state = None
-        self.symbol = "%"
-
-    def rx(self, origin, data):
-        if not data:
-            self.state = not self.state
-            return (self.name, self.state, self.next_modules)
-
-
-class Conjunction(Module):
-    def __init__(self, name, next_modules):
-        super().__init__(name, next_modules)
-        self.symbol = "&"
-        self.state_inputs = {}
-        self.state = None
-
-    def add_input(self, name, data):
-        if not isinstance(name, str):
-            raise ValueError(f"Type of name is: {type(name)}")
-        self.state_inputs[name] = data
-        # self.state = not all(self.state_inputs.values())
-
-    def rx(self, origin, data):
-        self.state_inputs[origin] = data
-        self.state = not all(self.state_inputs.values())
-        return (self.name, self.state, self.next_modules)
-
-
-class Broadcaster(Module):
-    def __init__(self, name, next_modules):
-        super().__init__(name, next_modules)
-        self.symbol = ""
-
-    def rx(self, origin, data):
-        return (self.name, data, self.next_modules)
-
-
-def print_states(modules, last_conj, cc):
-    states = [m.state for m in modules.values() if isinstance(m, FF)]
-    states_str = "".join(["1" if s else "0" for s in states])
-    states_req = [
-        m.state for m in modules.values() if m.name in last_conj.inputs
-    ]
-    states_req_str = "".join(["1" if s else "0" for s in states_req])
-    log.debug(f"CC: {cc}, States: {states_str}, Req: {states_req_str}")
-
-
-def run_sim_part2(modules):
-    last_conj = [m for m in modules.values() if "rx" in m.next_modules]
-    if len(last_conj) != 1:
-        raise ValueError(f"Expected one last conjunction, got: {last_conj}")
-    last_conj = last_conj[0]
-    log.info(f"Last conjunction: {last_conj}, inputs: {last_conj.inputs}")
-
-    req_states = dict([(n, True) for n in last_conj.inputs])
-    log.info(f"Required states: {req_states}")
-    req_periods = {}
-
-    for button_presses in track(range(1, 2**12)):
-        tx_queue = [("button", False, ["broadcaster"])]
-        while tx_queue:
-            origin, data, next_modules = tx_queue.pop(0)
-            if origin in req_states and data == req_states[origin]:
-                log.info(
-                    f"Found {data} state on {next_module} at button: {button_presses}"
-                )
-                req_periods[origin] = button_presses
-                if len(req_periods) == len(req_states):
-                    log.info(f"Found all periods: {req_periods}")
-                    lcm = np.lcm.reduce(list(req_periods.values()))
-                    log.info(f"LCM: {lcm}")
-                    log.info(f"Button press: {lcm}")
-                    return lcm
-            for next_module in next_modules:
-                if next_module == "rx":
+BROADCASTER = 0
+FLIP_FLOP = 1
+CONJUNCTION = 2
+SINK = 3
+
+
+class Network:
+    """
+    Module network compiled to integer ids. Flip-flop states are the bits
+    of one int, every conjunction remembers its inputs as a bitmask, and
+    the pulse queue is a ring buffer of (sender << 1 | level) events: an
+    event delivers the pulse to all of the sender's outputs in order,
+    which gives the same order as queueing every pulse separately.
+
+    """
+
+    def __init__(self, rows: list[str]):
+        outputs = {}
+        kinds = {}
+        for row in rows:
+            name, next_modules = row.split(" -> ")
+            if name.startswith("%"):
+                name = name[1:]
+                kinds[name] = FLIP_FLOP
+            elif name.startswith("&"):
+                name = name[1:]
+                kinds[name] = CONJUNCTION
+            elif name == "broadcaster":
+                kinds[name] = BROADCASTER
+            else:
+                raise ValueError(f"Unknown module type: {name}")
+            outputs[name] = next_modules.split(", ")
+        for next_modules in list(outputs.values()):
+            for n in next_modules:
+                if n not in kinds:
+                    kinds[n] = SINK
+                    outputs[n] = []
+
+        self.rows = rows
+        self.names = list(kinds)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.kind = [kinds[name] for name in self.names]
+        self.broadcaster = self.ids["broadcaster"]
+        self.inputs = [[] for _ in self.names]
+
+        # the outgoing edges of module m are edge_start[m]:edge_start[m + 1]
+        self.edge_start = []
+        self.edge_dst = []
+        self.edge_bit = []
+        for name in self.names:
+            self.edge_start.append(len(self.edge_dst))
+            for n in outputs[name]:
+                dst = self.ids[n]
+                self.edge_dst.append(dst)
+                self.edge_bit.append(1 << len(self.inputs[dst]))
+                self.inputs[dst].append(self.ids[name])
+        self.edge_start.append(len(self.edge_dst))
+        self.full_memory = [(1 << len(inputs)) - 1 for inputs in self.inputs]
+
+        self.ff_state = 0
+        self.memory = [0] * len(self.names)
+        size = 1
+        while size < 2 * len(self.edge_dst) + 2:
+            size <<= 1
+        self.ring = [0] * size
+
+    def state(self) -> tuple:
+        return (self.ff_state, tuple(self.memory))
+
+    def grow_ring(self, head: int, tail: int) -> list[int]:
+        size = len(self.ring)
+        pending = [self.ring[i & (size - 1)] for i in range(head, tail)]
+        self.ring = pending + [0] * size
+        return self.ring
+
+    def press(self, watch: int = -1) -> tuple[int, int, int, int]:
+        """
+        Push the button once. Returns the number of low and high pulses
+        sent, and the number of low and high pulses module `watch`
+        received.
+
+        """
+        kind = self.kind
+        edge_start = self.edge_start
+        edge_dst = self.edge_dst
+        edge_bit = self.edge_bit
+        full_memory = self.full_memory
+        memory = self.memory
+        ff_state = self.ff_state
+        ring = self.ring
+        mask = len(ring) - 1
+
+        pulses = [1, 0]
+        watched = [0, 0]
+        ring[0] = self.broadcaster << 1
+        head = 0
+        tail = 1
+        while head < tail:
+            event = ring[head & mask]
+            head += 1
+            src = event >> 1
+            level = event & 1
+            start = edge_start[src]
+            end = edge_start[src + 1]
+            pulses[level] += end - start
+            for e in range(start, end):
+                dst = edge_dst[e]
+                if dst == watch:
+                    watched[level] += 1
+                k = kind[dst]
+                if k == FLIP_FLOP:
+                    if level:
+                        continue
+                    ff_state ^= 1 << dst
+                    out = (ff_state >> dst) & 1
+                elif k == CONJUNCTION:
+                    if level:
+                        memory[dst] |= edge_bit[e]
+                    else:
+                        memory[dst] &= ~edge_bit[e]
+                    out = 0 if memory[dst] == full_memory[dst] else 1
+                elif k == BROADCASTER:
+                    out = level
+                else:
                     continue
-                tx = modules[next_module].rx(origin, data)
-                if tx:
-                    tx_queue.append(tx)
-
-    log.error("No solution found")
-    return -1
-
-
-def run_sim_part1(button_presses, modules):
+                if tail - head > mask:
+                    ring = self.grow_ring(head, tail)
+                    tail -= head
+                    head = 0
+                    mask = len(ring) - 1
+                ring[tail & mask] = (dst << 1) | out
+                tail += 1
+
+        self.ff_state = ff_state
+        return pulses[0], pulses[1], watched[0], watched[1]
+
+    def sub_circuits(self, final: int) -> list[tuple[list[str], str]] | None:
+        """
+        Split the modules feeding conjunction `final` into one sub-circuit
+        per input of `final`. Returns the rows of every sub-circuit, with
+        `final` left as a sink, and the name of the input it drives, or
+        None when the upstream modules of the inputs overlap or feed
+        anything but their own sub-circuit and `final`.
+
+        """
+        if self.kind[final] != CONJUNCTION:
+            return None
+        upstream = []
+        for i in self.inputs[final]:
+            modules = {i}
+            queue = [i]
+            while queue:
+                m = queue.pop()
+                for n in self.inputs[m]:
+                    if n != self.broadcaster and n not in modules:
+                        modules.add(n)
+                        queue.append(n)
+            upstream.append(modules)
+
+        seen = set()
+        for modules in upstream:
+            if self.broadcaster in modules or final in modules or seen & modules:
+                return None
+            seen |= modules
+            for m in modules:
+                for e in range(self.edge_start[m], self.edge_start[m + 1]):
+                    if self.edge_dst[e] not in modules and self.edge_dst[e] != final:
+                        return None
+
+        prefix = {FLIP_FLOP: "%", CONJUNCTION: "&"}
+        circuits = []
+        for i, modules in zip(self.inputs[final], upstream):
+            outputs = self.outputs(self.broadcaster, modules)
+            rows = [f"broadcaster -> {', '.join(outputs)}"]
+            for m in sorted(modules):
+                outputs = self.outputs(m, modules | {final})
+                rows.append(f"{prefix[self.kind[m]]}{self.names[m]} -> {', '.join(outputs)}")
+            circuits.append((rows, self.names[final]))
+        return circuits
+
+    def outputs(self, m: int, modules: set[int]) -> list[str]:
+        return [
+            self.names[self.edge_dst[e]]
+            for e in range(self.edge_start[m], self.edge_start[m + 1])
+            if self.edge_dst[e] in modules
+        ]
+
+
+def find_press_cycle(args: tuple[list[str], str]) -> tuple[int, int, list[int]]:
+    """
+    Press the button on a sub-circuit until its state repeats. Returns the
+    number of presses before the cycle starts, the cycle length and the
+    presses on which the sub-circuit sent a high pulse into the final
+    conjunction.
+
+    """
+    rows, watch = args
+    network = Network(rows)
+    watch = network.ids[watch]
+    # the state before press n + 1 is keyed to n
+    seen = {}
+    hits = []
+    presses = 0
+    while True:
+        state = network.state()
+        if state in seen:
+            return seen[state], presses - seen[state], hits
+        seen[state] = presses
+        presses += 1
+        _, _, _, watched_high = network.press(watch)
+        if watched_high:
+            hits.append(presses)
+
+
+def run_sim_part2(network: Network, nproc: int = 1) -> int:
+    rx = network.ids.get("rx")
+    if rx is None:
+        raise ValueError("No rx module in the network")
+    feeders = network.inputs[rx]
+    circuits = None
+    if len(feeders) == 1:
+        circuits = network.sub_circuits(feeders[0])
+
+    if circuits:
+        log.info(f"Split {network.names[feeders[0]]} into {len(circuits)} sub-circuits")
+        # rx gets a low pulse once every input of the final conjunction
+        # sends a high pulse on the same press
+        if nproc > 1:
+            with Pool(processes=nproc) as p:
+                cycles = p.map(find_press_cycle, circuits)
+        else:
+            cycles = [find_press_cycle(circuit) for circuit in circuits]
+        for (rows, _), (tail, period, hits) in zip(circuits, cycles):
+            log.info(
+                f"Sub-circuit of {len(rows) - 1} modules: tail {tail}, "
+                f"period {period}, hits {hits}"
+            )
+        # hits cover presses 1 .. tail + period, past that they repeat. A
+        # counter that fires on exactly the multiples of its period there
+        # does so forever, and then the answer is the lcm of the periods
+        if all(
+            hits == list(range(period, tail + period + 1, period))
+            for tail, period, hits in cycles
+        ):
+            return math.lcm(*(period for _, period, _ in cycles))
+        log.info("Sub-circuits are not plain counters")
+
+    log.info("Simulating the whole network")
+    network = Network(network.rows)
+    seen = set()
+    presses = 0
+    while True:
+        state = network.state()
+        if state in seen:
+            log.error("Network state repeats without a low pulse to rx")
+            return -1
+        seen.add(state)
+        presses += 1
+        _, _, watched_low, _ = network.press(rx)
+        if watched_low:
+            return presses
+
+
+def run_sim_part1(button_presses, network: Network):
     pulses_sum = [0, 0]
     t_start = time.time()
-    for i in track(range(0, button_presses)):
-        log.debug(f"Button press {i + 1}")
-        tx_queue = [("button", False, ["broadcaster"])]
-        while tx_queue:
-            origin, data, next_modules = tx_queue.pop(0)
-            for next_module in next_modules:
-                log.debug(
-                    f"{origin} -{'high' if data else 'low'}-> {next_module}"
-                )
-                pulses_sum[data] += 1
-                if next_module in modules:
-                    tx = modules[next_module].rx(origin, data)
-                    if tx:
-                        tx_queue.append(tx)
+    for _ in range(button_presses):
+        low, high, _, _ = network.press()
+        pulses_sum[0] += low
+        pulses_sum[1] += high
 
     t_end = time.time()
     log.info(f"Simulation took {t_end - t_start:.2f} seconds")
@@ -144,56 +301,30 @@ def run_sim_part1(button_presses, modules):
     return pulses_sum
 
 
-def load(rows):
-    modules = {}
-    for row in rows:
-        name = row.split(" -> ")[0]
-        next_modules = row.split(" -> ")[1].split(", ")
-        if name.startswith("%"):
-            name = name.strip("%")
-            modules[name.strip("%")] = FF(name, next_modules)
-        elif name.startswith("&"):
-            name = name.strip("&")
-            modules[name] = Conjunction(name, next_modules)
-        elif name == "broadcaster":
-            modules[name] = Broadcaster(name, next_modules)
-        else:
-            raise ValueError(f"Unknown module type: {name}")
-
-    for m in modules.values():
-        for n in m.next_modules:
-            if n not in modules:
-                log.warning(f"Module {n} not found, skipping")
-                continue
-            modules[n].inputs.append(m.name)
-            if isinstance(modules[n], Conjunction):
-                modules[n].add_input(m.name, False)
-                # modules[n].add_input(m.name, modules[m.name].state)
-    return modules
-
-
 def main(
     input_file: typer.FileText,
     log_level: str = "INFO",
     part1: bool = True,
     part2: bool = True,
+    nproc: int = 1,
 ):
     log.setLevel(log_level)
     rows = input_file.read().strip().split("\n")
 
     if part1:
-        modules = load(rows)
+        network = Network(rows)
 
         button_presses = 1000
-        pulses_sum = run_sim_part1(button_presses, modules)
+        pulses_sum = run_sim_part1(button_presses, network)
         log.info(f"Part 1 answer: {pulses_sum[True] * pulses_sum[False]}")
 
     if part2:
-        modules = load(rows)
-        ans = run_sim_part2(modules)
+        network = Network(rows)
+        ans = run_sim_part2(network, nproc)
         log.info(f"Part 2 answer: {ans}")
 
 
 if __name__ == "__main__":
     # cProfile.run("typer.run(main)")
+    freeze_support()
     typer.run(main)
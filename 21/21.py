@@ -20,232 +20,310 @@ logging.basicConfig(
 log = logging.getLogger("rich")
 
 
-class Direction(Enum):
-    UP = 0
-    DOWN = 1
-    LEFT = 2
-    RIGHT = 3
-
-
-def get_coordinates_in_direction(x, y, direction: Direction):
-    if direction == Direction.UP:
-        return (x - 1, y)
-    elif direction == Direction.RIGHT:
-        return (x, y + 1)
-    elif direction == Direction.DOWN:
-        return (x + 1, y)
-    else:
-        return (x, y - 1)
+class Garden:
+    """
+    Garden plots as a boolean array. The plots reachable in exactly k steps
+    are kept as a frontier array, which one step shifts in the four
+    directions, ORs together and masks with the open plots. Stepping back
+    and forth is always allowed, so once the frontier repeats two steps
+    later it alternates forever and larger step budgets only depend on
+    their parity.
+
+    """
+
+    def __init__(self, rows: list[str]):
+        raw = np.frombuffer("".join(rows).encode(), dtype=np.uint8)
+        grid = raw.reshape(len(rows), len(rows[0]))
+        self.rows = rows
+        self.open = grid != ord("#")
+        self.height, self.width = grid.shape
+        ys, xs = np.nonzero(grid == ord("S"))
+        if len(ys) != 1:
+            raise ValueError("Expected exactly one start plot")
+        self.start = (int(ys[0]), int(xs[0]))
+
+    def step(self, frontier: np.ndarray) -> np.ndarray:
+        reached = np.zeros_like(frontier)
+        reached[1:] |= frontier[:-1]
+        reached[:-1] |= frontier[1:]
+        reached[:, 1:] |= frontier[:, :-1]
+        reached[:, :-1] |= frontier[:, 1:]
+        reached &= self.open
+        return reached
+
+    def reachable_many(
+        self, budgets: list[int], start: tuple[int, int] | None = None
+    ) -> list[int]:
+        """
+        Number of plots reachable in exactly each of the step budgets, in
+        one walk from `start` (the S plot by default).
+
+        """
+        if start is None:
+            start = self.start
+        frontier = np.zeros_like(self.open)
+        frontier[start] = self.open[start]
+        counts = [np.count_nonzero(frontier)]
+        previous = None
+        steps = 0
+        last = max(budgets, default=0)
+        while steps < last:
+            reached = self.step(frontier)
+            steps += 1
+            if previous is not None and np.array_equal(reached, previous):
+                break
+            previous = frontier
+            frontier = reached
+            counts.append(np.count_nonzero(frontier))
+
+        saturated = len(counts) - 1
+        ans = []
+        for budget in budgets:
+            if budget > saturated:
+                budget = saturated - (budget - saturated) % 2
+            ans.append(counts[budget])
+        return ans
+
+    def distances(self, start: tuple[int, int] | None = None) -> np.ndarray:
+        """
+        Shortest number of steps to every plot, -1 if it can't be reached.
+
+        """
+        if start is None:
+            start = self.start
+        distances = np.full(self.open.shape, -1, dtype=np.int64)
+        frontier = np.zeros_like(self.open)
+        frontier[start] = self.open[start]
+        visited = frontier.copy()
+        steps = 0
+        while frontier.any():
+            distances[frontier] = steps
+            frontier = self.step(frontier) & ~visited
+            visited |= frontier
+            steps += 1
+        return distances
+
+    def has_clear_lanes(self) -> bool:
+        sy, sx = self.start
+        return bool(self.open[sy].all() and self.open[:, sx].all())
+
+    def reachable(self, steps: int, start: tuple[int, int] | None = None) -> int:
+        return self.reachable_many([steps], start)[0]
+
+
+def tile_rows(rows: list[str], radius: int) -> list[str]:
+    """
+    Tile the map (2 * radius + 1) times in both directions, keeping only
+    the S in the middle tile.
+
+    """
+    copies = 2 * radius + 1
+    plain = [row.replace("S", ".") * copies for row in rows]
+    tiled = plain * copies
+    for y, row in enumerate(rows):
+        x = row.find("S")
+        if x >= 0:
+            y += radius * len(rows)
+            x += radius * len(rows[0])
+            tiled[y] = tiled[y][:x] + "S" + tiled[y][x + 1 :]
+    return tiled
+
+
+def reachable_quadratic(garden: Garden, steps: int) -> int | None:
+    """
+    With an open row and column through S the count at steps n + k * w,
+    w the width of the map, grows quadratically in k. Fit the quadratic on
+    the exact counts for k = 0, 1, 2 on a tiled window and check it on
+    k = 3. Returns None when the check fails.
+
+    """
+    width = garden.width
+    n = steps % width
+    budgets = [n + k * width for k in range(4)]
+    tiled = Garden(tile_rows(garden.rows, tile_radius(garden, max(budgets))))
+    if steps <= budgets[-1]:
+        return tiled.reachable(steps)
+
+    f0, f1, f2, f3 = tiled.reachable_many(budgets)
+    d1 = f1 - f0
+    d2 = f2 - 2 * f1 + f0
+    log.debug(f"Samples at {budgets}: {[f0, f1, f2, f3]}")
+    if f3 != f0 + 3 * d1 + 3 * d2:
+        return None
+    k = steps // width
+    return f0 + k * d1 + k * (k - 1) // 2 * d2
 
 
-class Node:
-    def __init__(self, row, col):
-        self.row = row
-        self.col = col
+def tile_radius(garden: Garden, steps: int) -> int:
+    # the closest plot outside the window is radius * width + margin + 1 away
+    sy, sx = garden.start
+    margin = min(sy, sx, garden.height - 1 - sy, garden.width - 1 - sx)
+    return max(0, -(-(steps - margin) // garden.width))
 
-        self.neighbors = []
 
-        self.lowest_steps_even = math.inf
-        self.lowest_steps_odd = math.inf
+def count_tile_copies(distances: np.ndarray, shift: int, steps: int) -> int:
+    """
+    Count the plots reachable in exactly `steps` in the copies of a tile
+    whose distances are `distances` + t * shift, for t >= 1.
 
-        self.steps_to_saturation = -1
-        self.page_nodes_on_saturation = -1
-        self.steps_to_side = dict([(d, (0, None)) for d in Direction])
+    """
+    d = distances[distances >= 0]
+    last = (steps - d) // shift
+    if shift % 2:
+        # t has to fix the parity of steps - d
+        first = np.where((steps - d) % 2 == 1, 1, 2)
+        stride = 2
+    else:
+        first = np.where((steps - d) % 2 == 0, 1, last + 1)
+        stride = 1
+    terms = np.maximum(0, (last - first) // stride + 1)
+    return int(terms.sum())
 
-    def add_neighbor(self, neighbor):
-        self.neighbors.append(neighbor)
-        neighbor.neighbors.append(self)
 
-    def __repr__(self):
-        return f"Node({self.row}, {self.col})"
+def count_corner_copies(
+    distances: np.ndarray, shift_y: int, shift_x: int, steps: int
+) -> int:
+    """
+    Count the plots reachable in exactly `steps` in the copies of a corner
+    tile whose distances are `distances` + m * shift_y + l * shift_x, for
+    m, l >= 0 but not both 0.
+
+    """
+    d = distances[distances >= 0]
+    if shift_y != shift_x:
+        ans = count_tile_copies(d, shift_x, steps)
+        d = d + shift_y
+        while (d <= steps).any():
+            ans += int(np.count_nonzero((d <= steps) & ((steps - d) % 2 == 0)))
+            ans += count_tile_copies(d, shift_x, steps)
+            d = d + shift_y
+        return ans
+
+    # t * shift further out there are t + 1 copies
+    shift = shift_y
+    last = (steps - d) // shift
+    if shift % 2:
+        first = np.where((steps - d) % 2 == 1, 1, 2)
+        stride = 2
+    else:
+        first = np.where((steps - d) % 2 == 0, 1, last + 1)
+        stride = 1
+    terms = np.maximum(0, (last - first) // stride + 1)
+    return int((terms * (first + 1) + stride * terms * (terms - 1) // 2).sum())
 
 
-def get_lowest_node(nodes: dict, side: Direction, r: int) -> Node:
-    if side == Direction.UP:
-        ns = [nodes[(0, c)] for c in range(r)]
-    elif side == Direction.RIGHT:
-        ns = [nodes[(c, r - 1)] for c in range(r)]
-    elif side == Direction.DOWN:
-        ns = [nodes[(r - 1, c)] for c in range(r)]
-    else:
-        ns = [nodes[(c, 0)] for c in range(r)]
-
-    lowest_node = ns[0]
-    for n in ns[1:]:
-        if n.lowest_steps_even < lowest_node.lowest_steps_even:
-            lowest_node = n
-        elif n.lowest_steps_odd < lowest_node.lowest_steps_odd:
-            lowest_node = n
-    if (
-        min(lowest_node.lowest_steps_even, lowest_node.lowest_steps_odd)
-        == math.inf
-    ):
+def tile_shift(tile: np.ndarray, inner: np.ndarray) -> int | None:
+    # how much further every plot of a tile is than in the next tile inwards
+    reached = tile >= 0
+    if not np.array_equal(reached, inner >= 0):
         return None
-    return lowest_node
-
-
-def load(rows: list[str], wrap: bool = False) -> tuple[dict, Node]:
-    nodes = {}
-    width = len(rows[0])
-    height = len(rows)
-    log.debug(f"width: {width}, height: {height}")
-    assert height % 2 == 1, "Height must be odd"
-    assert width == height, "Width must equal height"
-
-    for row, r in enumerate(rows):
-        for col, char in enumerate(r):
-            if char == "." or char == "S":
-                node = Node(row, col)
-                nodes[(row, col)] = node
-                neighbors = [
-                    (row - 1, col),
-                    (row + 1, col),
-                    (row, col - 1),
-                    (row, col + 1),
-                ]
-                for n in neighbors:
-                    if wrap:
-                        if n[0] < 0:
-                            n = (height - 1, n[1])
-                        elif n[0] >= height:
-                            n = (0, n[1])
-                        if n[1] < 0:
-                            n = (n[0], width - 1)
-                        elif n[1] >= width:
-                            n = (n[0], 0)
-                    if n in nodes:
-                        node.add_neighbor(nodes[n])
-                if char == "S":
-                    start = node
-                    start.lowest_steps = 0
-    return nodes, start
-
-
-def find_saturation_point(nodes: dict, n: Node, r: int):
-    max_steps = 0
-    max_nodes = 0
-    num_last_visited = 0
-    for s in range(200):
-        visited = end_positions_per_page(nodes, n, s)
-        if visited == num_last_visited:
-            if s > max_steps:
-                max_steps = s
-                max_nodes = visited
+    shifts = np.unique(tile[reached] - inner[reached])
+    if len(shifts) != 1 or shifts[0] <= 0:
+        return None
+    return int(shifts[0])
+
+
+# cell budget for a tiled window, a frontier array of this size takes a
+# few milliseconds per step
+MAX_WINDOW_CELLS = 2**20
+
+
+def reachable_tile_classes(
+    garden: Garden, steps: int, max_window: int = MAX_WINDOW_CELLS
+) -> int:
+    """
+    Count by tile class. Shortest distances are computed on a tiled window;
+    every tile beyond it is a copy of an edge or corner tile of the window,
+    whose distances grow by a fixed shift per tile further out. The shift
+    is taken from the next tile inwards, doubling the window until it is
+    the same for every plot of every edge and corner tile, as long as the
+    window fits in `max_window` cells. If it never is, the plots are
+    counted by a direct walk on a window that holds all of them, if that
+    fits.
+
+    This only needs the distances to become periodic in the tiles,
+    not an open row and column through S or an open border.
+
+    """
+    width = garden.width
+    direct_radius = tile_radius(garden, steps)
+    # largest radius whose padded window fits in the budget
+    max_radius = (math.isqrt(max_window) // width - 3) // 2
+    radius = 2
+    while radius <= max_radius:
+        # the outer ring of tiles only pads the window: some of its plots
+        # are reached through tiles outside it
+        tiled = Garden(tile_rows(garden.rows, radius + 1))
+        distances = tiled.distances()[width:-width, width:-width]
+        reached = (
+            (distances >= 0) & (distances <= steps) & ((steps - distances) % 2 == 0)
+        )
+        ans = int(np.count_nonzero(reached))
+        if radius >= direct_radius:
+            return ans
+
+        copies = 2 * radius + 1
+        tiles = distances.reshape(copies, width, copies, width).swapaxes(1, 2)
+        last = copies - 1
+
+        edges = []
+        for i in range(1, last):
+            edges += [((0, i), (1, i)), ((last, i), (last - 1, i))]
+            edges += [((i, 0), (i, 1)), ((i, last), (i, last - 1))]
+        edge_shifts = [tile_shift(tiles[tile], tiles[inner]) for tile, inner in edges]
+
+        corners = []
+        corner_shifts = []
+        for y, iy in ((0, 1), (last, last - 1)):
+            for x, ix in ((0, 1), (last, last - 1)):
+                corners.append((y, x))
+                corner_shifts.append(
+                    (
+                        tile_shift(tiles[y, x], tiles[iy, x]),
+                        tile_shift(tiles[y, x], tiles[y, ix]),
+                    )
+                )
+
+        if None in edge_shifts or any(None in s for s in corner_shifts):
+            log.debug(f"Tile distances not periodic yet at radius {radius}")
+            if radius == max_radius:
                 break
-    return (max_steps, max_nodes)
-
-
-memo = dict()
-
-
-# @functools.lru_cache(maxsize=None)
-def end_positions_per_page(nodes: dict, start: Node, max_steps) -> int:
-    if (start, max_steps) in memo:
-        return memo[(start, max_steps)]
-    visited_even = set()
-    visited_odd = set()
-    end_nodes = set()
-    queue = [(start, 0)]
-    while queue:
-        node, steps = queue.pop(0)
-        if steps % 2 == 0:
-            if steps >= node.lowest_steps_even and node in visited_even:
-                continue
-            node.lowest_steps_even = steps
-            visited_even.add(node)
-        else:
-            if steps >= node.lowest_steps_odd and node in visited_odd:
-                continue
-            node.lowest_steps_odd = steps
-            visited_odd.add((node, steps))
-        if steps < max_steps:
-            for neighbor in node.neighbors:
-                queue.append((neighbor, steps + 1))
-
-    memo[(start, max_steps)] = len(visited_even)
-    return len(visited_even)
-
-
-# per page:
-# voor elke entry node bepalen wat het aantal steps is om m te saturaten
-# voor elke entry node bepalen wat per kant de optimale exit node is en hoeveel
-# steps dat nodig heeft
-# dan per page in de queue exit nodes bepalen per side, en dan
-
-
-def get_neighbor_in_direction(nodes, node, direction, r) -> Node:
-    row, col = get_coordinates_in_direction(node.row, node.col, direction)
-    if row < 0:
-        row = r - 1
-    elif row >= r:
-        row = 0
-    if col < 0:
-        col = r - 1
-    elif col >= r:
-        col = 0
-    return nodes[(row, col)]
-
-
-def end_positions_inf_grid(
-    nodes: dict, start: Node, max_steps: int, r: int
+            radius = min(2 * radius, max_radius)
+            continue
+
+        for (tile, _), shift in zip(edges, edge_shifts):
+            ans += count_tile_copies(tiles[tile], shift, steps)
+        for tile, (shift_y, shift_x) in zip(corners, corner_shifts):
+            ans += count_corner_copies(tiles[tile], shift_y, shift_x, steps)
+        return ans
+
+    if ((2 * direct_radius + 1) * width) ** 2 <= max_window:
+        log.info(f"Tile distances not periodic, walking {direct_radius} tiles out")
+        return Garden(tile_rows(garden.rows, direct_radius)).reachable(steps)
+    raise ValueError(
+        f"Tile distances not periodic within {max_window} cells, "
+        f"a direct walk needs {direct_radius} tiles out"
+    )
+
+
+def reachable_infinite(
+    garden: Garden, steps: int, max_window: int = MAX_WINDOW_CELLS
 ) -> int:
-    nodes_edge = [
-        nodes[n]
-        for n in nodes
-        if n[0] == 0 or n[1] == 0 or n[1] == r - 1 or n[1] == r - 1
-    ] + [start]
-    for n in nodes_edge:
-        (
-            n.steps_to_saturation,
-            n.page_nodes_on_saturation,
-        ) = find_saturation_point(nodes, n, r)
-        nc = nodes.copy()
-
-        for side in Direction:
-            lowest_node = get_lowest_node(nc, side, r)
-            ln = nodes[(lowest_node.row, lowest_node.col)]
-            min_steps = min(
-                lowest_node.lowest_steps_even, lowest_node.lowest_steps_odd
-            )
-            next_entry = get_neighbor_in_direction(nodes, ln, side, r)
-            n.steps_to_side[side] = (min_steps, next_entry)
-
-    pages = set()
-    sum_end_positions = 0
-    queue = [(0, 0, start, max_steps)]
-    log.debug(f"r: {r}")
-    while queue:
-        x, y, entry, steps_left = queue.pop(0)
-        log.debug(f"Processing page: {x=}, {y=}, {entry=}, {steps_left=}")
-        if steps_left >= entry.steps_to_saturation:
-            sum_end_positions += entry.page_nodes_on_saturation
-            steps_left -= entry.page_nodes_on_saturation
-            for side in Direction:
-                xa, ya = get_coordinates_in_direction(x, y, side)
-                if (xa, ya) in pages:
-                    continue
-                pages.add((x, y))
-                s, new_entry = entry.steps_to_side[side]
-                new_steps_left = steps_left - s
-                queue.append((xa, ya, new_entry, new_steps_left))
-        else:
-            nc = nodes.copy()
-            sum_end_positions += end_positions_per_page(nc, entry, steps_left)
-            for side in Direction:
-                lowest_node = get_lowest_node(nc, side, r)
-                if not lowest_node:
-                    continue
-                xa, ya = get_coordinates_in_direction(x, y, side)
-                if (xa, ya) in pages:
-                    continue
-                if ms <= 0:
-                    continue
-
-                pages.add((x, y))
-                ms, new_entry = entry.steps_to_side[side]
-                queue.append((xa, ya, new_entry, ms))
-
-    return sum_end_positions
+    """
+    Number of plots reachable in exactly `steps` on the infinitely tiled
+    map.
+
+    """
+    if garden.height != garden.width:
+        raise ValueError("Infinite grid needs a square map")
+    if garden.has_clear_lanes():
+        ans = reachable_quadratic(garden, steps)
+        if ans is not None:
+            return ans
+        log.warning("Quadratic fit failed its check, counting by tile class")
+    else:
+        log.info("No open row and column through S, counting by tile class")
+    return reachable_tile_classes(garden, steps, max_window)
 
 
 def main(
@@ -253,18 +331,20 @@ def main(
     log_level: str = "INFO",
     part1: bool = True,
     part2: bool = True,
+    steps: int = 64,
+    part2_steps: int = 26501365,
+    max_window: int = MAX_WINDOW_CELLS,
 ):
     log.setLevel(log_level)
     rows = input_file.read().strip().split("\n")
 
+    garden = Garden(rows)
     if part1:
-        nodes, start = load(rows)
-        ans = end_positions_per_page(nodes, start, 64)
+        ans = garden.reachable(steps)
         log.info(f"Part 1 answer: {ans}")
 
     if part2:
-        nodes, start = load(rows, True)
-        ans = end_positions_inf_grid(nodes, start, 100, len(rows))
+        ans = reachable_infinite(garden, part2_steps, max_window)
         log.info(f"Part 2 answer: {ans}")
 
 
@@ -1,6 +1,9 @@
 import typer
+from bisect import bisect_right
 from typing import TypedDict
 
+import numpy as np
+
 
 class Map:
     def __init__(self, dest, src, range) -> None:
@@ -108,16 +111,11 @@ def find_mappings(input: list[str]) -> Mappings:
 
 
 def resolve_seeds(seeds: list[Seed], mappings: Mappings) -> list[Seed]:
+    keys = mapping_chain(mappings)
     for seed in seeds:
-        next_key_startswith = "seed"
-        for _ in mappings:
-            for k in mappings:
-                if k.startswith(next_key_startswith):
-                    key = k
-                    break
+        for key in keys:
             source_key = key.split("_")[0]
             dest_key = key.split("_")[-1]
-            next_key_startswith = dest_key
             seed.values[dest_key] = lookup(seed.values[source_key], mappings[key])
     return seeds
 
@@ -137,30 +135,146 @@ def resolve_seed_reverse(location: int, mappings: Mappings) -> Seed:
     return seed
 
 
+def mapping_chain(mappings: Mappings) -> list[str]:
+    keys = []
+    next_key_startswith = "seed"
+    for _ in mappings:
+        for k in mappings:
+            if k.startswith(next_key_startswith):
+                key = k
+                break
+        keys.append(key)
+        next_key_startswith = key.split("_")[-1]
+    return keys
+
+
+def merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, num in sorted(ranges):
+        if num <= 0:
+            continue
+        if merged and start <= merged[-1][0] + merged[-1][1]:
+            prev_start, prev_num = merged[-1]
+            end = max(prev_start + prev_num, start + num)
+            merged[-1] = (prev_start, end - prev_start)
+        else:
+            merged.append((start, num))
+    return merged
+
+
+def split_range(start: int, end: int, maps: list[Map]):
+    """
+    Split [start, end) against maps sorted by source start, yielding
+    (start, end, offset) pieces.
+
+    """
+    for map in maps:
+        map_start = map.source_range_start
+        map_end = map_start + map.range_length
+        if map_end <= start:
+            continue
+        if map_start >= end:
+            break
+        if map_start > start:
+            # gap before this map passes through unchanged
+            yield (start, map_start, 0)
+            start = map_start
+        stop = min(map_end, end)
+        yield (start, stop, map.dest_range_start - map_start)
+        start = stop
+        if start >= end:
+            break
+    if start < end:
+        yield (start, end, 0)
+
+
+def lookup_ranges(
+    ranges: list[tuple[int, int]], maps: list[Map]
+) -> list[tuple[int, int]]:
+    maps = sorted(maps, key=lambda m: m.source_range_start)
+    out: list[tuple[int, int]] = []
+    for start, num in ranges:
+        for piece_start, piece_end, offset in split_range(
+            start, start + num, maps
+        ):
+            out.append((piece_start + offset, piece_end - piece_start))
+    return merge_ranges(out)
+
+
+class CompiledMappings:
+    """
+    The whole seed -> location chain as one piecewise-linear function: for
+    starts[i] <= seed < starts[i + 1], location = seed + offsets[i].
+
+    """
+
+    def __init__(self, mappings: Mappings) -> None:
+        keys = mapping_chain(mappings)
+        # every stage maps [0, bound) into itself and is the identity above
+        bound = 1 + max(
+            [0]
+            + [
+                max(map.source_range_start, map.dest_range_start)
+                + map.range_length
+                for key in keys
+                for map in mappings[key]
+            ]
+        )
+        pieces = [(0, bound, 0)]
+        for key in keys:
+            maps = sorted(mappings[key], key=lambda m: m.source_range_start)
+            next_pieces = []
+            for start, end, offset in pieces:
+                for piece_start, piece_end, delta in split_range(
+                    start + offset, end + offset, maps
+                ):
+                    next_pieces.append(
+                        (piece_start - offset, piece_end - offset, offset + delta)
+                    )
+            pieces = next_pieces
+
+        self.starts: list[int] = []
+        self.offsets: list[int] = []
+        for start, _, offset in pieces + [(bound, None, 0)]:
+            if self.offsets and self.offsets[-1] == offset:
+                continue
+            self.starts.append(start)
+            self.offsets.append(offset)
+        self.starts_array = np.array(self.starts, dtype=np.int64)
+        self.offsets_array = np.array(self.offsets, dtype=np.int64)
+
+    def lookup(self, seed: int) -> int:
+        return seed + self.offsets[bisect_right(self.starts, seed) - 1]
+
+    def lookup_many(self, seeds: np.ndarray) -> np.ndarray:
+        seeds = np.asarray(seeds, dtype=np.int64)
+        idx = np.searchsorted(self.starts_array, seeds, side="right") - 1
+        return seeds + self.offsets_array[idx]
+
+
+def resolve_seed_ranges(
+    seed_ranges: list[tuple[int, int]], mappings: Mappings
+) -> list[tuple[int, int]]:
+    ranges = merge_ranges(seed_ranges)
+    for key in mapping_chain(mappings):
+        ranges = lookup_ranges(ranges, mappings[key])
+    return ranges
+
 
 def main(input_file: typer.FileText):
     input = input_file.read().split("\n")
 
     seeds = find_seeds_part_1(input)
     mappings = find_mappings(input)
-    seeds = resolve_seeds(seeds, mappings)
-    locations = [seed.values["location"] for seed in seeds]
-    print(f"Min location part 1: {min(locations)}")
+    compiled = CompiledMappings(mappings)
+    locations = compiled.lookup_many([seed.values["seed"] for seed in seeds])
+    print(f"Min location part 1: {locations.min()}")
 
     seed_ranges = find_seed_ranges_part_2(input)
     mappings = find_mappings(input)
-    #seeds = resolve_seeds(seeds, mappings)
-    location = 0
-    while True:
-        seed = resolve_seed_reverse(location, mappings)
-        #print(f"Resolved location {location} to seed {seed.values['seed']}")
-        for start, num in seed_ranges:
-            if seed.values["seed"] >= start and seed.values["seed"] < start + num:
-                print(f"Location {location} is seed {seed.values['seed']}")
-                return
-        location+=1
-    #locations = [seed.values["location"] for seed in seeds]
-    #print(f"Min location part 2: {min(locations)}")
+    location_ranges = resolve_seed_ranges(seed_ranges, mappings)
+    print(f"Location ranges part 2: {len(location_ranges)}")
+    print(f"Min location part 2: {location_ranges[0][0]}")
 
 
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
 import typer
+import math
 from typing import TypedDict
 
+import numpy as np
+
 
 class Race:
     def __init__(self, time, record_distance) -> None:
@@ -52,11 +55,56 @@ def bruteforce_num_ways_to_win(races: list[Race]) -> list[Race]:
         print(f"Race {i}: num ways to win: {race.num_ways_to_win}")
     return races
 
+def num_ways_to_win(time: int, record_distance: int) -> int:
+    # button times t with t * (time - t) > record_distance lie strictly
+    # between the roots of t^2 - time * t + record_distance
+    disc = time * time - 4 * record_distance
+    if disc < 0:
+        return 0
+    t_min = (time - math.isqrt(disc)) // 2
+    while t_min <= time // 2 and t_min * (time - t_min) <= record_distance:
+        t_min += 1
+    while t_min > 0 and (t_min - 1) * (time - t_min + 1) > record_distance:
+        t_min -= 1
+    # the win region is symmetric around time / 2
+    t_max = time - t_min
+    return max(0, t_max - t_min + 1)
+
+
+def solve_num_ways_to_win(races: list[Race]) -> list[Race]:
+    # int64 products t * (time - t) are exact up to time < 2^31
+    if not races or max(race.time for race in races) >= 2**31:
+        for race in races:
+            race.num_ways_to_win = num_ways_to_win(race.time, race.record_distance)
+        return races
+
+    times = np.array([race.time for race in races], dtype=np.int64)
+    records = np.array([race.record_distance for race in races], dtype=np.int64)
+    disc = times * times - 4 * records
+    roots = np.floor(np.sqrt(np.maximum(disc, 0).astype(np.float64)))
+    t_min = (times - roots.astype(np.int64)) // 2
+    # correct float rounding of the square root on the boundary
+    while True:
+        too_low = (t_min * (times - t_min) <= records) & (t_min <= times // 2)
+        if not too_low.any():
+            break
+        t_min += too_low
+    while True:
+        too_high = (t_min > 0) & ((t_min - 1) * (times - t_min + 1) > records)
+        if not too_high.any():
+            break
+        t_min -= too_high
+    ways = np.where(disc < 0, 0, np.maximum(times - 2 * t_min + 1, 0))
+    for race, n in zip(races, ways.tolist()):
+        race.num_ways_to_win = n
+    return races
+
+
 def main(input_file: typer.FileText):
     input = input_file.read().split("\n")
 
     races = get_races_part_1(input)
-    races = bruteforce_num_ways_to_win(races)
+    races = solve_num_ways_to_win(races)
     part_1_ans = 1
     for race in races:
         part_1_ans *= race.num_ways_to_win
@@ -64,7 +112,7 @@ def main(input_file: typer.FileText):
     print(f"Part 1: {part_1_ans}")
 
     races = get_races_part_2(input)
-    races = bruteforce_num_ways_to_win(races)
+    races = solve_num_ways_to_win(races)
     part_2_ans = races[0].num_ways_to_win
     print(f"Part 2: {part_2_ans}")
 
@@ -1,7 +1,8 @@
 import typer
 from typing import TypedDict
 from enum import Enum
-from functools import cmp_to_key
+
+import numpy as np
 
 card_values = {
     "2": 2,
@@ -50,20 +51,9 @@ class HandType(Enum):
     FIVE_OF_A_KIND = 6
 
 
-def compare_first_card(hand1: Hand, hand2: Hand) -> int:
-    for c1, c2 in zip(hand1.hand, hand2.hand):
-        if card_values[c1] > card_values[c2]:
-            return 1
-        elif card_values[c1] < card_values[c2]:
-            return -1
-    return 0
-
-
 def get_hand_type(hand: Hand) -> HandType:
     hand_type = HandType.HIGH_CARD
-    print(f"hand: {hand.hand}")
     for card in hand.cards:
-        print(f"card: {card}, num: {hand.cards_num[card]}")
         if hand.cards_num[card] == 5:
             return HandType.FIVE_OF_A_KIND
         elif hand.cards_num[card] == 4:
@@ -83,17 +73,17 @@ def get_hand_type(hand: Hand) -> HandType:
     return HandType.HIGH_CARD
 
 
-def compare_hands(hand1: Hand, hand2: Hand) -> int:
-    if hand1.hand_type.value > hand2.hand_type.value:
-        return 1
-    elif hand1.hand_type.value < hand2.hand_type.value:
-        return -1
-    else:
-        return compare_first_card(hand1, hand2)
+def hand_key(hand_type: HandType, hand: str, values: dict[str, int]) -> int:
+    # hand type in bits 20-22, then 4 bits per card from first to last
+    key = hand_type.value
+    for card in hand:
+        key = (key << 4) | values[card]
+    return key
 
 
 class Hand:
     def __init__(self, hand: str, bid: int, joker: bool = False):
+        values = card_values_joker if joker else card_values
         self.hand = hand
         self.bid = int(bid)
         self.cards = set(hand)
@@ -110,16 +100,71 @@ class Hand:
                     max_num = self.cards_num[card]
                     joker_key = card
                 elif self.cards_num[card] == max_num:
-                    if card_values[card] > card_values[joker_key]:
+                    if values[card] > values[joker_key]:
                         joker_key = card
         if joker and joker_key and "J" in self.cards:
             self.cards_num[joker_key] += self.cards_num["J"]
             self.cards_num["J"] = 0
         self.hand_type = get_hand_type(self)
+        self.key = hand_key(self.hand_type, hand, values)
         self.rank = -1
         self.winnings = -1
 
 
+def hand_keys_many(hands: list[str], joker: bool = False) -> np.ndarray:
+    values = card_values_joker if joker else card_values
+    table = np.zeros(256, dtype=np.int64)
+    for card, value in values.items():
+        table[ord(card)] = value
+    raw = np.frombuffer("".join(hands).encode(), dtype=np.uint8)
+    ranks = table[raw.reshape(len(hands), 5)]
+
+    counts = np.zeros((len(hands), 15), dtype=np.int64)
+    rows = np.arange(len(hands))
+    for i in range(5):
+        np.add.at(counts, (rows, ranks[:, i]), 1)
+    if joker:
+        jokers = counts[:, values["J"]].copy()
+        counts[:, values["J"]] = 0
+    counts.sort(axis=1)
+    top = counts[:, -1]
+    second = counts[:, -2]
+    if joker:
+        top = top + jokers
+
+    hand_types = np.select(
+        [
+            top == 5,
+            top == 4,
+            (top == 3) & (second == 2),
+            top == 3,
+            (top == 2) & (second == 2),
+            top == 2,
+        ],
+        [
+            HandType.FIVE_OF_A_KIND.value,
+            HandType.FOUR_OF_A_KIND.value,
+            HandType.FULL_HOUSE.value,
+            HandType.THREE_OF_A_KIND.value,
+            HandType.TWO_PAIR.value,
+            HandType.ONE_PAIR.value,
+        ],
+        HandType.HIGH_CARD.value,
+    )
+    keys = hand_types
+    for i in range(5):
+        keys = (keys << 4) | ranks[:, i]
+    return keys
+
+
+def total_winnings_many(
+    hands: list[str], bids: list[int], joker: bool = False
+) -> int:
+    order = np.argsort(hand_keys_many(hands, joker), kind="stable")
+    ranked_bids = np.asarray(bids, dtype=np.int64)[order]
+    return int((ranked_bids * np.arange(1, len(hands) + 1)).sum())
+
+
 def main(input_file: typer.FileText):
     input = input_file.read().split("\n")
     hands = []
@@ -131,7 +176,7 @@ def main(input_file: typer.FileText):
         hand = Hand(line[0], line[1])
         hands.append(hand)
 
-    hands.sort(key=cmp_to_key(compare_hands))
+    hands.sort(key=lambda hand: hand.key)
 
     total_winnings = 0
     for rank, hand in enumerate(hands):
@@ -145,10 +190,6 @@ def main(input_file: typer.FileText):
     print(f"Part 1 total winnings: {total_winnings}")
 
     hands = []
-    global card_values
-    global card_values_joker
-    card_values = card_values_joker
-
     for line in input:
         if line == "":
             continue
@@ -156,7 +197,7 @@ def main(input_file: typer.FileText):
         hand = Hand(line[0], line[1], True)
         hands.append(hand)
 
-    hands.sort(key=cmp_to_key(compare_hands))
+    hands.sort(key=lambda hand: hand.key)
 
     total_winnings = 0
     for rank, hand in enumerate(hands):
@@ -1,48 +1,227 @@
 import typer
 import math
 
+import numpy as np
+
+from multiprocessing import Pool, freeze_support
+
+
+class Network:
+    """
+    Network compiled to integer node ids. `cycle[n]` is the node reached
+    from n after one full pass over the instructions, and `lift[k]` jumps
+    2^k full passes at once.
+
+    """
+
+    def __init__(self, nodes: dict[str, dict[str, str]], instructions: str):
+        self.names = list(nodes)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.moves = [0 if instruction == "L" else 1 for instruction in instructions]
+        self.next = np.array(
+            [
+                [self.ids[nodes[name]["L"]] for name in self.names],
+                [self.ids[nodes[name]["R"]] for name in self.names],
+            ],
+            dtype=np.int64,
+        )
+        current = np.arange(len(self.names))
+        for move in self.moves:
+            current = self.next[move][current]
+        self.cycle = current
+        self.lift = [self.cycle]
+        self.hit_tables = {}
+        self.next_lists = self.next.tolist()
+
+    def lift_levels(self, levels: int):
+        while len(self.lift) < levels:
+            self.lift.append(self.lift[-1][self.lift[-1]])
+
+    def step(self, node: int, steps: int) -> int:
+        cycles, remainder = divmod(steps, len(self.moves))
+        self.lift_levels(cycles.bit_length())
+        k = 0
+        while cycles:
+            if cycles & 1:
+                node = int(self.lift[k][node])
+            cycles >>= 1
+            k += 1
+        for move in self.moves[:remainder]:
+            node = int(self.next[move][node])
+        return node
+
+    def first_hits(self, is_target: np.ndarray) -> np.ndarray:
+        """
+        Step index (1-based) of the first target hit within one instruction
+        pass from every node, or -1 if the pass misses all targets.
+
+        """
+        current = np.arange(len(self.names))
+        first = np.full(len(self.names), -1, dtype=np.int64)
+        for i, move in enumerate(self.moves):
+            current = self.next[move][current]
+            hit = (first < 0) & is_target[current]
+            first[hit] = i + 1
+        return first
+
+    def hit_lift(self, is_target: np.ndarray):
+        key = is_target.tobytes()
+        if key not in self.hit_tables:
+            first = self.first_hits(is_target)
+            # the pass-to-pass walk repeats within len(names) passes, so if
+            # no target is hit in that many passes it is never hit
+            levels = len(self.names).bit_length() + 1
+            self.lift_levels(levels)
+            hit_lift = [first >= 0]
+            for k in range(1, levels):
+                hit_lift.append(hit_lift[-1] | hit_lift[-1][self.lift[k - 1]])
+            self.hit_tables[key] = (first, hit_lift)
+        return self.hit_tables[key]
+
+    def steps_to_target(self, start: int, is_target: np.ndarray) -> int | None:
+        first, hit_lift = self.hit_lift(is_target)
+        levels = len(hit_lift)
+
+        node = start
+        cycles = 0
+        for k in reversed(range(levels)):
+            if not hit_lift[k][node]:
+                node = int(self.lift[k][node])
+                cycles += 1 << k
+        if first[node] < 0:
+            return None
+        return cycles * len(self.moves) + int(first[node])
+
+
+class GhostCycle:
+    """
+    Z hits of one ghost: the hits in the first `tail` steps are listed in
+    `tail_hits`, after that the walk repeats with `period` steps and
+    `cycle_hits` lists the hits of the first repetition.
+
+    """
+
+    def __init__(self, tail: int, period: int, hits: list[int]):
+        self.tail = tail
+        self.period = period
+        self.tail_hits = [h for h in hits if h <= tail]
+        self.cycle_hits = [h for h in hits if h > tail]
+        self.residues = {h % period for h in self.cycle_hits}
+
+    def is_hit(self, step: int) -> bool:
+        if step <= self.tail:
+            return step in self.tail_hits
+        return step % self.period in self.residues
+
+    def hits_before(self, end: int):
+        yield from (h for h in self.tail_hits if h < end)
+        for h in self.cycle_hits:
+            while h < end:
+                yield h
+                h += self.period
+
+
+def find_ghost_cycle(network: Network, start: int, is_target: list[bool]):
+    # (node, instruction index) only repeats on pass boundaries once the
+    # node at the start of a pass repeats
+    seen = {}
+    hits = []
+    node = start
+    passes = 0
+    while node not in seen:
+        seen[node] = passes
+        offset = passes * len(network.moves)
+        for i, move in enumerate(network.moves):
+            node = network.next_lists[move][node]
+            if is_target[node]:
+                hits.append(offset + i + 1)
+        passes += 1
+    tail = seen[node] * len(network.moves)
+    period = (passes - seen[node]) * len(network.moves)
+    return GhostCycle(tail, period, hits)
+
+
+def crt(a1: int, m1: int, a2: int, m2: int) -> tuple[int, int] | None:
+    g = math.gcd(m1, m2)
+    if (a2 - a1) % g:
+        return None
+    lcm = m1 // g * m2
+    k = (a2 - a1) // g * pow(m1 // g, -1, m2 // g) % (m2 // g)
+    return ((a1 + m1 * k) % lcm, lcm)
+
+
+def first_common_hit(cycles: list[GhostCycle]) -> int | None:
+    # before every ghost is inside its cycle, check the hits directly
+    cycle_start = max(c.tail for c in cycles) + 1
+    for step in sorted(cycles[0].hits_before(cycle_start)):
+        if all(c.is_hit(step) for c in cycles[1:]):
+            return step
+
+    solutions = {(0, 1)}
+    for c in cycles:
+        combined = set()
+        for a, m in solutions:
+            for r in c.residues:
+                solution = crt(a, m, r, c.period)
+                if solution:
+                    combined.add(solution)
+        solutions = combined
+        if not solutions:
+            return None
+
+    best = None
+    for a, m in solutions:
+        step = a + max(0, -((a - cycle_start) // m)) * m
+        if best is None or step < best:
+            best = step
+    return best
+
+
+worker_network = None
+worker_is_target = None
+
+
+def init_ghost_worker(network: Network, is_target: list[bool]):
+    global worker_network, worker_is_target
+    worker_network = network
+    worker_is_target = is_target
+
+
+def ghost_worker(start: int) -> GhostCycle:
+    return find_ghost_cycle(worker_network, start, worker_is_target)
+
 
 def part1(nodes, instructions):
-    current_node = "AAA"
-    instructions_traversed = 0
     if "AAA" not in nodes:
         return
-    while True:
-        for instruction in instructions:
-            current_node = nodes[current_node][instruction]
-            instructions_traversed += 1
-            if current_node == "ZZZ":
-                break
-        if current_node == "ZZZ":
-            break
+    network = Network(nodes, instructions)
+    is_target = np.array([name == "ZZZ" for name in network.names])
+    instructions_traversed = network.steps_to_target(
+        network.ids["AAA"], is_target
+    )
 
     print(f"Part 1: instructions traversed: {instructions_traversed}")
 
 
-def part2(nodes, instructions):
-    current_nodes = [node for node in nodes if node.endswith("A")]
-    periods = []
-    for current_node in current_nodes:
-        instructions_traversed = 0
-        period = None
-        while True:
-            for instruction in instructions:
-                current_node = nodes[current_node][instruction]
-                instructions_traversed += 1
-                if current_node.endswith("Z"):
-                    periods.append(instructions_traversed)
-                    break
-            if current_node.endswith("Z"):
-                break
-
-    gcd = math.gcd(*periods)
-    periods = [p // gcd for p in periods]
-    product = math.prod(periods)
-    instructions_traversed = product * gcd
+def part2(nodes, instructions, nproc: int = 1):
+    network = Network(nodes, instructions)
+    is_target = [name.endswith("Z") for name in network.names]
+    starts = [network.ids[node] for node in nodes if node.endswith("A")]
+    if nproc > 1:
+        with Pool(
+            processes=nproc,
+            initializer=init_ghost_worker,
+            initargs=(network, is_target),
+        ) as p:
+            cycles = p.map(ghost_worker, starts)
+    else:
+        cycles = [find_ghost_cycle(network, s, is_target) for s in starts]
+
+    instructions_traversed = first_common_hit(cycles)
     print(f"Part2: {instructions_traversed}")
 
 
-def main(input_file: typer.FileText):
+def main(input_file: typer.FileText, nproc: int = 1):
     input = input_file.read().split("\n")
 
     nodes = {}
@@ -61,8 +240,9 @@ def main(input_file: typer.FileText):
             instructions = row.strip()
 
     part1(nodes, instructions)
-    part2(nodes, instructions)
+    part2(nodes, instructions, nproc)
 
 
 if __name__ == "__main__":
+    freeze_support()
     typer.run(main)
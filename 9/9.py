@@ -1,7 +1,9 @@
 import typer
 import math
+import functools
 from itertools import pairwise
 
+import numpy as np
 
 
 def predict(sequence: list[int]) -> int:
@@ -20,6 +22,44 @@ def sum_predictions(sequence: list[int]) -> int:
     return sum_predictions
 
 
+@functools.lru_cache(maxsize=None)
+def binomial_weights(n: int) -> tuple[list[int], list[int]]:
+    # the difference table of n values extrapolates the unique polynomial
+    # of degree < n, which gives binomial weights on the values themselves
+    forward = [(-1) ** (n - 1 - i) * math.comb(n, i) for i in range(n)]
+    backward = [(-1) ** i * math.comb(n, i + 1) for i in range(n)]
+    return forward, backward
+
+
+def extrapolate_many(
+    sequences: list[list[int]],
+) -> tuple[list[int], list[int]]:
+    next_values = [0] * len(sequences)
+    prev_values = [0] * len(sequences)
+    by_length = {}
+    for i, s in enumerate(sequences):
+        by_length.setdefault(len(s), []).append(i)
+
+    for n, indices in by_length.items():
+        if n == 0:
+            continue
+        forward, backward = binomial_weights(n)
+        largest = max(abs(x) for i in indices for x in sequences[i])
+        # sum(|weights|) == 2^n - 1, so this bounds every partial sum, and
+        # the weights themselves only fit below n == 63
+        if n < 63 and largest * 2**n < 2**63:
+            dtype = np.int64
+        else:
+            dtype = object
+        matrix = np.array([sequences[i] for i in indices], dtype=dtype)
+        weights = np.array([forward, backward], dtype=dtype).T
+        result = matrix.dot(weights)
+        for i, (next_value, prev_value) in zip(indices, result.tolist()):
+            next_values[i] = int(next_value)
+            prev_values[i] = int(prev_value)
+    return next_values, prev_values
+
+
 def main(input_file: typer.FileText):
     input = input_file.read().split("\n")
 
@@ -30,12 +70,9 @@ def main(input_file: typer.FileText):
         sequence = [int(x) for x in row.split(" ") if x != ""]
         sequences.append(sequence)
 
-    print(f"Part 1: {sum_predictions(sequences)}")
-
-    sequences_reversed = sequences
-    for s in sequences_reversed:
-        s.reverse()
-    print(f"Part 2: {sum_predictions(sequences_reversed)}")
+    next_values, prev_values = extrapolate_many(sequences)
+    print(f"Part 1: {sum(next_values)}")
+    print(f"Part 2: {sum(prev_values)}")
 
 
 if __name__ == "__main__":